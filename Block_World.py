@@ -1,15 +1,244 @@
-import tkinter as tk
+import argparse
 import time
 import copy
-from collections import deque
+import functools
+import heapq
+import itertools
+import json
+import mmap
+import multiprocessing
+import os
+import random
+import shutil
+import string
+import struct
+import sys
+import tempfile
+import threading
+import warnings
+from collections import OrderedDict, deque
+
+try:
+    import tkinter as tk
+except ImportError:  # Headless installs can still plan, see --batch
+    tk = None
+
+
+# Colors cycled through for block faces in the GUI
+BLOCK_PALETTE = ["#e94560", "#0f3460", "#16c79a", "#f39c12", "#9b59b6",
+                 "#3498db", "#e67e22", "#1abc9c", "#c0392b", "#7f8c8d"]
+
+# Default three-block problem: C sits on A, B is on the table
+DEFAULT_LAYOUT = {"A": "table", "B": "table", "C": "A"}
+
+# Records read per file access when streaming an external-search record file
+READ_CHUNK = 4096
+
+
+def block_names(count):
+    """Names for `count` blocks: A, B, C, ... (B0, B1, ... beyond 26)"""
+    if count <= 26:
+        return list(string.ascii_uppercase[:count])
+    return [f"B{i}" for i in range(count)]
+
+
+def random_layout(blocks, rng=None):
+    """Random stacks of `blocks`, as an `on` map (block -> "table" or block)"""
+    rng = rng or random.Random()
+    order = list(blocks)
+    rng.shuffle(order)
+    on = {}
+    tops = []
+    for block in order:
+        # Start a new tower or put the block on top of an existing one
+        slot = rng.randrange(len(tops) + 1)
+        if slot == len(tops):
+            on[block] = "table"
+            tops.append(block)
+        else:
+            on[block] = tops[slot]
+            tops[slot] = block
+    return {block: on[block] for block in blocks}
+
+
+def random_problem(num_blocks, seed=None):
+    """Random (initial `on` map, goal) instance with `num_blocks` blocks"""
+    rng = random.Random(seed)
+    blocks = block_names(num_blocks)
+    return random_layout(blocks, rng), random_layout(blocks, rng)
+
+
+class PlanningCancelled(Exception):
+    """Raised inside a planner after cancel() or once its deadline has passed"""
+
+
+class PlanCache:
+    """LRU cache of plans keyed by a canonical (planner, start state, goal)
+
+    With a `path`, entries are loaded from that JSON file on creation and
+    written back after every new plan, so a restarted process can reuse
+    plans without searching. An unreadable file is ignored with a warning.
+    """
+    
+    # Planner options that only say where scratch files go, not which plan is found
+    IGNORED_OPTIONS = ("spill_dir",)
+    
+    def __init__(self, capacity=1024, path=None):
+        self.capacity = capacity
+        self.path = path
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if path and os.path.exists(path):
+            self.load()
+    
+    @staticmethod
+    def key(world, goal, method="bfs", **options):
+        """Canonical key: independent of dict order and of how the world was built
+
+        Planner options that can change the plan (heuristic, memory_limit,
+        ...) are part of the key, unless None. Returns None when an option
+        has no JSON form, e.g. a heuristic function: that plan is not cached.
+        """
+        start = sorted((block, world.on[block]) for block in world.blocks)
+        options = sorted((name, value) for name, value in options.items()
+                         if value is not None and name not in PlanCache.IGNORED_OPTIONS)
+        try:
+            return json.dumps([method, start, world.arms, sorted(goal.items()), options])
+        except TypeError:
+            return None
+    
+    @staticmethod
+    def normalize(plan):
+        """Plans as tuples again after a JSON round trip (parallel steps included)"""
+        if plan is None:
+            return None
+        normalized = []
+        for item in plan:
+            if isinstance(item[0], str):
+                normalized.append(tuple(item))
+            else:
+                normalized.append([(arm, tuple(action)) for arm, action in item])
+        return normalized
+    
+    def get(self, key):
+        """Return (True, plan) on a hit, (False, None) on a miss"""
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            plan = self.entries[key]
+            return True, self.normalize(plan)
+        self.misses += 1
+        return False, None
+    
+    def put(self, key, plan):
+        self.entries[key] = self.normalize(plan)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+        if self.path:
+            self.save()
+    
+    def load(self):
+        """Read entries from `path`; on any problem with the file start empty"""
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+            for key, plan in data:
+                if not isinstance(key, str) or not (plan is None or isinstance(plan, list)):
+                    raise ValueError(f"bad entry {key!r}")
+                self.entries[key] = self.normalize(plan)
+        except Exception as e:
+            warnings.warn(f"Ignoring unreadable plan cache {self.path}: {e}")
+            self.entries.clear()
+            return
+        while len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+    
+    def save(self):
+        """Write entries in LRU order; the file is replaced atomically"""
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w") as f:
+            json.dump([[key, plan] for key, plan in self.entries.items()], f)
+        os.replace(temp_path, self.path)
 
 
 class BlockWorldAgent:
     """AI Agent that uses STRIPS-like planning to solve Block World problems"""
     
-    def __init__(self, world):
+    # Most spill runs plan_bfs_external keeps open in one merge
+    MERGE_FAN_IN = 64
+    
+    def __init__(self, world, cache=None):
         self.world = world
-        self.blocks = ["A", "B", "C"]
+        self.cache = cache
+        self.blocks = list(world.blocks)
+        self.index = {block: i for i, block in enumerate(self.blocks)}
+        # Compact state: one field per block holding its support,
+        # 0 = table, i + 1 = on block i, held_code = in the gripper.
+        # Which blocks are clear is derived from the fields, never stored.
+        self.held_code = len(self.blocks) + 1
+        self.field_bits = self.held_code.bit_length()
+        self.field_mask = (1 << self.field_bits) - 1
+        self.ground_operators()
+        # Search statistics of the last planning call, updated while it runs
+        self.stats = {}
+        # Interruption: cancel() from another thread, or a time.perf_counter() deadline
+        self.cancelled = threading.Event()
+        self.deadline = None
+    
+    def cancel(self):
+        """Ask a running planner (possibly on another thread) to stop"""
+        self.cancelled.set()
+    
+    def check_interrupt(self):
+        """Called once per expansion; raises PlanningCancelled when asked to stop"""
+        if self.cancelled.is_set() or (self.deadline is not None and time.perf_counter() > self.deadline):
+            self.stats["cancelled"] = True
+            raise PlanningCancelled()
+    
+    def ground_operators(self):
+        """Instantiate every STRIPS operator once for this set of blocks
+
+        An operator is (action, pre_mask, pre_value, clear_mask, effect):
+        it applies to a state code when code & pre_mask == pre_value and every
+        block in the clear_mask bitset is clear, and the successor code is
+        code ^ effect. Operators are indexed so that a state only looks at
+        the ones whose field precondition it already satisfies:
+        take_ops[i][support]:  pick_up/unstack of block i from that support
+        place_ops[i]:          put_down/stack of held block i, in search order
+        place_index[i][value]: the place operator leaving block i on that support
+        """
+        bits = self.field_bits
+        held_code = self.held_code
+        self.operators = []
+        self.take_ops = []
+        self.place_ops = []
+        self.place_index = []
+        for i, block in enumerate(self.blocks):
+            shift = i * bits
+            field = self.field_mask << shift
+            take = {}
+            for support in range(len(self.blocks) + 1):
+                if support == i + 1:
+                    continue
+                name = "pick_up" if support == 0 else "unstack"
+                take[support] = ((name, block, None), field, support << shift,
+                                 1 << i, (support ^ held_code) << shift)
+            put_down = (("put_down", block, None), field, held_code << shift,
+                        0, held_code << shift)
+            stacks = [(("stack", block, target), field, held_code << shift,
+                       1 << j, (held_code ^ (j + 1)) << shift)
+                      for j, target in enumerate(self.blocks) if j != i]
+            # Legacy order: put_down comes first only for the first block
+            place = [put_down] + stacks if i == 0 else stacks + [put_down]
+            self.take_ops.append(take)
+            self.place_ops.append(place)
+            self.place_index.append({(op[2] ^ op[4]) >> shift: op for op in place})
+            self.operators.extend(take.values())
+            self.operators.extend(place)
     
     def get_state(self, world):
         """Get current state as a hashable tuple"""
@@ -17,39 +246,410 @@ class BlockWorldAgent:
                 tuple(sorted(world.clear.items())), 
                 world.holding)
     
-    def clone_world(self, world):
-        """Create a copy of the world state"""
-        new_world = BlockWorld()
+    @staticmethod
+    def clone_world(world):
+        """Create a copy of the world state (needs no agent)"""
+        new_world = BlockWorld(world.initial_on, world.arm_count)
         new_world.on = dict(world.on)
         new_world.clear = dict(world.clear)
-        new_world.holding = world.holding
+        new_world.arms = list(world.arms)
         return new_world
     
-    def get_possible_actions(self, world):
-        """Generate all possible valid actions from current state"""
-        actions = []
-        
-        for block in self.blocks:
-            # Try pick_up
-            if world.holding is None and world.on[block] == "table" and world.clear[block]:
-                actions.append(("pick_up", block, None))
-            
-            # Try put_down
+    def support_code(self, target):
+        """Field value for a support name ("table" or a block)"""
+        return 0 if target == "table" else self.index[target] + 1
+    
+    def encode(self, world):
+        """Pack a world into a single int (one field per block)
+
+        The code has one gripper, arm 0: a block held by any other arm
+        raises ValueError (plan such worlds with plan_parallel).
+        """
+        for arm, block in enumerate(world.arms[1:], 1):
+            if block is not None:
+                raise ValueError(f"Arm {arm} is holding {block}; single-arm planners only model arm 0, "
+                                 f"use plan_parallel")
+        code = 0
+        for i, block in enumerate(self.blocks):
             if world.holding == block:
-                actions.append(("put_down", block, None))
-            
-            # Try unstack
-            target = world.on[block]
-            if target and target != "table" and world.clear[block] and world.holding is None:
-                actions.append(("unstack", block, None))
+                value = self.held_code
+            else:
+                value = self.support_code(world.on[block])
+            code |= value << (i * self.field_bits)
+        return code
+    
+    def decode(self, code):
+        """Unpack a state code into a list of per-block supports"""
+        supports = []
+        for _ in self.blocks:
+            supports.append(code & self.field_mask)
+            code >>= self.field_bits
+        return supports
+    
+    def load_state(self, world, code):
+        """Overwrite a world's on/clear/holding from a state code"""
+        supports = self.decode(code)
+        world.holding = None
+        world.on = {}
+        world.clear = {block: True for block in self.blocks}
+        for i, block in enumerate(self.blocks):
+            value = supports[i]
+            if value == self.held_code:
+                world.on[block] = None
+                world.holding = block
+            elif value == 0:
+                world.on[block] = "table"
+            else:
+                world.on[block] = self.blocks[value - 1]
+                world.clear[self.blocks[value - 1]] = False
+        return world
+    
+    def applicable_operators(self, code):
+        """Grounded operators whose preconditions hold in `code`"""
+        supports = self.decode(code)
+        held_code = self.held_code
+        covered = 0
+        held = None
+        for i, value in enumerate(supports):
+            if value == held_code:
+                held = i
+            elif value:
+                covered |= 1 << (value - 1)
+        
+        if held is not None:
+            return [op for op in self.place_ops[held] if not op[3] & covered]
+        
+        ops = []
+        clear = ((1 << len(supports)) - 1) & ~covered
+        while clear:
+            low = clear & -clear
+            i = low.bit_length() - 1
+            ops.append(self.take_ops[i][supports[i]])
+            clear ^= low
+        return ops
+    
+    def successors(self, code):
+        """Generate (action, child_code) pairs for every applicable action
+
+        Each action rewrites exactly one block's field, so applying it is
+        code ^ effect and undoing it is the same xor again; no world objects
+        are built. Actions come out in the order get_possible_actions has
+        always used, so BFS returns the same plans.
+        """
+        for op in self.applicable_operators(code):
+            yield op[0], code ^ op[4]
+    
+    def predecessors(self, code):
+        """Regress a complete state through the grounded operators
+
+        Generates (action, parent_code) pairs such that applying the action
+        in parent_code yields `code`. An operator regresses through a state
+        when its effect holds there (the moved block is in the gripper for
+        pick_up/unstack, or on the operator's support for put_down/stack);
+        the parent is code ^ effect, kept only if it is a valid state.
+        """
+        supports = self.decode(code)
+        held_code = self.held_code
+        covered = 0
+        held = None
+        for i, value in enumerate(supports):
+            if value == held_code:
+                held = i
+            elif value:
+                covered |= 1 << (value - 1)
+        
+        if held is not None:
+            # The block was just taken from a support that is free again now
+            for support, op in self.take_ops[held].items():
+                if support and (covered >> (support - 1) & 1 or support - 1 == held):
+                    continue
+                yield op[0], code ^ op[4]
+            return
+        
+        # Otherwise some clear block was just put down or stacked
+        clear = ((1 << len(supports)) - 1) & ~covered
+        while clear:
+            low = clear & -clear
+            i = low.bit_length() - 1
+            op = self.place_index[i][supports[i]]
+            yield op[0], code ^ op[4]
+            clear ^= low
+    
+    def goal_states(self, goal, limit=None):
+        """All hand-empty state codes satisfying `goal`, or None past `limit`"""
+        count = len(self.blocks)
+        targets = self.goal_supports(goal)
+        supports = [0] * count
+        used = set()
+        states = []
+        
+        def grounded(i):
+            # Every block must reach the table without revisiting a block
+            seen = set()
+            while supports[i]:
+                if i in seen:
+                    return False
+                seen.add(i)
+                i = supports[i] - 1
+            return True
+        
+        def assign(i):
+            if limit is not None and len(states) > limit:
+                return
+            if i == count:
+                if all(grounded(j) for j in range(count)):
+                    states.append(sum(v << (j * self.field_bits) for j, v in enumerate(supports)))
+                return
+            options = [targets[i]] if targets[i] is not None else range(count + 1)
+            for value in options:
+                if value == i + 1 or (value and value in used):
+                    continue
+                supports[i] = value
+                if value:
+                    used.add(value)
+                assign(i + 1)
+                used.discard(value)
+        
+        assign(0)
+        if limit is not None and len(states) > limit:
+            return None
+        return states
+    
+    def plan_bidirectional(self, goal, max_goal_states=100000):
+        """Bidirectional BFS: forward from the start, backward by regression
+
+        The backward search starts from every complete state satisfying the
+        goal and regresses through the operators. Whole layers are expanded
+        on the side with the smaller frontier; once a layer touches the
+        other side, the cheapest meeting point in that layer gives an
+        optimal plan. Goals that leave more than `max_goal_states`
+        completions are handed to plan_astar instead.
+        """
+        self.stats = {"expanded": 0, "visited": 1, "peak_frontier": 1}
+        if self.goal_reached(self.world, goal):
+            return []
+        goal_codes = self.goal_states(goal, max_goal_states)
+        if goal_codes is None:
+            plan = self.plan_astar(goal)
+            self.stats["fallback"] = "astar"
+            return plan
+        if not goal_codes:
+            return None
+        
+        start = self.encode(self.world)
+        parents = {start: None}
+        children = {code: None for code in goal_codes}
+        depth = {start: 0}
+        back_depth = {code: 0 for code in goal_codes}
+        forward = [start]
+        backward = list(goal_codes)
+        
+        while forward and backward:
+            best = None
+            if len(forward) <= len(backward):
+                next_layer = []
+                for code in forward:
+                    self.stats["expanded"] += 1
+                    self.check_interrupt()
+                    for _, child in self.successors(code):
+                        if child in parents:
+                            continue
+                        parents[child] = code
+                        depth[child] = depth[code] + 1
+                        next_layer.append(child)
+                        if child in children:
+                            cost = depth[child] + back_depth[child]
+                            if best is None or cost < best[0]:
+                                best = (cost, child)
+                forward = next_layer
+            else:
+                next_layer = []
+                for code in backward:
+                    self.stats["expanded"] += 1
+                    self.check_interrupt()
+                    for _, parent in self.predecessors(code):
+                        if parent in children:
+                            continue
+                        children[parent] = code
+                        back_depth[parent] = back_depth[code] + 1
+                        next_layer.append(parent)
+                        if parent in parents:
+                            cost = depth[parent] + back_depth[parent]
+                            if best is None or cost < best[0]:
+                                best = (cost, parent)
+                backward = next_layer
             
-            # Try stack
-            if world.holding is not None:
-                for target in self.blocks:
-                    if target != world.holding and world.clear[target]:
-                        actions.append(("stack", world.holding, target))
+            self.stats["visited"] = len(parents) + len(children)
+            self.stats["peak_frontier"] = max(self.stats["peak_frontier"], len(forward) + len(backward))
+            if best is not None:
+                meet = best[1]
+                plan = self.rebuild_plan(parents, meet)
+                code = meet
+                while children[code] is not None:
+                    plan.append(self.action_between(code, children[code]))
+                    code = children[code]
+                return plan
+        
+        return None
+    
+    def parallel_steps(self, state, arm_count):
+        """Generate (step, child_state) for every set of independent arm actions
+
+        `state` is a tuple of per-block supports (0 table, j + 1 on block j,
+        -(a + 1) held by arm a). Each arm idles or takes one action; actions in
+        a step must involve disjoint blocks (the moved block and the support it
+        leaves or lands on), so they can run in any order with the same
+        result.
+        """
+        covered = {value for value in state if value > 0}
+        options = [[] for _ in range(arm_count)]
+        for i, value in enumerate(state):
+            block = self.blocks[i]
+            if value < 0:
+                arm = -value - 1
+                options[arm].append((("put_down", block, None), 1 << i, i, 0))
+                for j, target in enumerate(self.blocks):
+                    if j != i and state[j] >= 0 and j + 1 not in covered:
+                        options[arm].append((("stack", block, target), (1 << i) | (1 << j), i, j + 1))
+            elif i + 1 not in covered:
+                involved = (1 << i) | ((1 << (value - 1)) if value else 0)
+                action = ("pick_up" if value == 0 else "unstack", block, None)
+                for arm in range(arm_count):
+                    if -(arm + 1) not in state:
+                        options[arm].append((action, involved, i, -(arm + 1)))
+        
+        step = []
+        child = list(state)
+        
+        def combine(arm, used):
+            if arm == arm_count:
+                if step:
+                    yield list(step), tuple(child)
+                return
+            yield from combine(arm + 1, used)
+            for action, involved, i, value in options[arm]:
+                if involved & used:
+                    continue
+                old = child[i]
+                child[i] = value
+                step.append((arm, action))
+                yield from combine(arm + 1, used | involved)
+                step.pop()
+                child[i] = old
         
-        return actions
+        yield from combine(0, 0)
+    
+    def plan_parallel(self, goal, arms=None):
+        """Makespan-optimal plan for a world with several arms
+
+        Returns a list of time steps, each a list of (arm, action) pairs that
+        run together. A* over time steps uses an admissible bound: every
+        block that must move needs a take and a place, at most `arms` actions
+        fit in a step, and blocks in one tower can only be taken one step
+        after another.
+        """
+        arm_count = arms or self.world.arm_count
+        self.stats = {"expanded": 0, "visited": 1, "peak_frontier": 0}
+        if self.goal_reached(self.world, goal):
+            return []
+        targets = self.goal_supports(goal)
+        count = len(self.blocks)
+        held = {block: arm for arm, block in enumerate(self.world.arms) if block is not None}
+        start = tuple(-(held[block] + 1) if block in held else self.support_code(self.world.on[block])
+                      for block in self.blocks)
+        
+        def h(state):
+            must_move = [None] * count
+            for i in range(count):
+                j = i
+                chain = []
+                while must_move[j] is None:
+                    value = state[j]
+                    if value < 0 or (targets[j] is not None and value != targets[j]):
+                        must_move[j] = True
+                    elif value == 0:
+                        must_move[j] = False
+                    else:
+                        chain.append(j)
+                        j = value - 1
+                        continue
+                    break
+                for k in chain:
+                    must_move[k] = must_move[j]
+            actions = 0
+            longest = 0
+            on_top = {value - 1: i for i, value in enumerate(state) if value > 0}
+            for i in range(count):
+                if not must_move[i]:
+                    continue
+                if state[i] < 0:
+                    actions += 1
+                    longest = max(longest, 1)
+                    continue
+                actions += 2
+                # Blocks that must move above i (and i itself) are taken one per step
+                depth = 1
+                k = on_top.get(i)
+                while k is not None:
+                    depth += 1
+                    k = on_top.get(k)
+                longest = max(longest, depth + 1)
+            return max(-(-actions // arm_count), longest)
+        
+        def is_goal(state):
+            return all(v >= 0 for v in state) and all(t is None or state[i] == t for i, t in enumerate(targets))
+        
+        tie = itertools.count()
+        best_g = {start: 0}
+        parents = {start: None}
+        frontier = [(h(start), 0, next(tie), start)]
+        while frontier:
+            if len(frontier) > self.stats["peak_frontier"]:
+                self.stats["peak_frontier"] = len(frontier)
+            _, neg_g, _, state = heapq.heappop(frontier)
+            g = -neg_g
+            if g > best_g[state]:
+                continue
+            if is_goal(state):
+                steps = []
+                while parents[state] is not None:
+                    state, step = parents[state]
+                    steps.append(step)
+                steps.reverse()
+                self.stats["visited"] = len(best_g)
+                self.stats["makespan"] = len(steps)
+                self.stats["actions"] = sum(len(step) for step in steps)
+                return steps
+            self.stats["expanded"] += 1
+            self.check_interrupt()
+            for step, child in self.parallel_steps(state, arm_count):
+                if g + 1 < best_g.get(child, g + 2):
+                    best_g[child] = g + 1
+                    parents[child] = (state, step)
+                    heapq.heappush(frontier, (g + 1 + h(child), -(g + 1), next(tie), child))
+        self.stats["visited"] = len(best_g)
+        return None
+    
+    def state_memory(self, visited):
+        """Approximate bytes per stored state: set slot plus the int code"""
+        if not visited:
+            return 0
+        return sys.getsizeof(visited) / len(visited) + sys.getsizeof(next(iter(visited)))
+    
+    def goal_pattern(self, goal):
+        """(mask, value) such that a hand-empty state code satisfies the goal
+        exactly when code & mask == value"""
+        mask = 0
+        value = 0
+        for block, target in goal.items():
+            shift = self.index[block] * self.field_bits
+            mask |= self.field_mask << shift
+            value |= self.support_code(target) << shift
+        return mask, value
+    
+    def get_possible_actions(self, world):
+        """Generate all possible valid actions from current state"""
+        return [op[0] for op in self.applicable_operators(self.encode(world))]
     
     def apply_action(self, world, action):
         """Apply an action to a world state and return success"""
@@ -70,103 +670,887 @@ class BlockWorldAgent:
         for block, target in goal.items():
             if world.on[block] != target:
                 return False
-        return world.holding is None
+        return all(arm is None for arm in world.arms)
     
-    def plan_bfs(self, goal):
-        """Use BFS to find a plan to reach the goal state"""
-        start_state = self.get_state(self.world)
+    def plan(self, goal, method="bfs", **options):
+        """Plan with plan_<method>, answering from the plan cache when possible"""
+        planner = getattr(self, f"plan_{method}")
+        if self.cache is None:
+            return planner(goal, **options)
+        key = PlanCache.key(self.world, goal, method, **options)
+        if key is None:
+            return planner(goal, **options)
+        hit, plan = self.cache.get(key)
+        if hit:
+            self.stats = {"expanded": 0, "cache_hit": True}
+            return plan
+        plan = planner(goal, **options)
+        self.cache.put(key, plan)
+        return plan
+    
+    def plan_bfs(self, goal, memory_limit=None, spill_dir=None):
+        """Use BFS to find a plan to reach the goal state
+
+        The queue holds bare state codes and every visited state keeps a
+        pointer to its parent; the plan is rebuilt once, at the goal. With a
+        `memory_limit` in bytes the search runs out of core instead, see
+        plan_bfs_external.
+        """
+        if memory_limit is not None:
+            return self.plan_bfs_external(goal, memory_limit, spill_dir)
         
+        self.stats = {"expanded": 0, "visited": 1, "peak_frontier": 0}
         if self.goal_reached(self.world, goal):
             return []
         
-        queue = deque([(self.clone_world(self.world), [])])
-        visited = {start_state}
+        start = self.encode(self.world)
+        goal_mask, goal_value = self.goal_pattern(goal)
+        queue = deque([start])
+        parents = {start: None}
         
-        while queue:
-            current_world, plan = queue.popleft()
-            
-            for action in self.get_possible_actions(current_world):
-                new_world = self.clone_world(current_world)
-                if self.apply_action(new_world, action):
-                    new_state = self.get_state(new_world)
-                    
-                    if new_state not in visited:
-                        new_plan = plan + [action]
+        try:
+            while queue:
+                if len(queue) > self.stats["peak_frontier"]:
+                    self.stats["peak_frontier"] = len(queue)
+                code = queue.popleft()
+                self.stats["expanded"] += 1
+                self.check_interrupt()
+                
+                for action, new_code in self.successors(code):
+                    if new_code not in parents:
+                        parents[new_code] = code
                         
-                        if self.goal_reached(new_world, goal):
-                            return new_plan
+                        # Only put_down/stack leave the hand empty, as the goal requires
+                        if action[0] in ("put_down", "stack") and new_code & goal_mask == goal_value:
+                            return self.rebuild_plan(parents, new_code)
                         
-                        visited.add(new_state)
-                        queue.append((new_world, new_plan))
+                        queue.append(new_code)
+            
+            return None
+        finally:
+            self.stats["visited"] = len(parents)
+            self.stats["bytes_per_state"] = self.state_memory(parents)
+    
+    def is_goal(self, code, goal_mask, goal_value):
+        """Goal test on a state code: goal fields match and the hand is empty"""
+        return code & goal_mask == goal_value and self.held_code not in self.decode(code)
+    
+    def plan_bfs_external(self, goal, memory_limit, spill_dir=None):
+        """Layered BFS that keeps the search on disk
+
+        Each BFS layer is a file of (state, parent) records sorted by state.
+        Children of a layer are buffered in memory until the buffer reaches
+        `memory_limit` bytes, then sorted and written out as a run; the runs
+        are merged, de-duplicated and filtered against the two previous
+        layers (every action can be undone, so a state seen earlier lies in
+        one of them). At most MERGE_FAN_IN runs (fewer under a small
+        `memory_limit`) are open at once; more are first merged in passes.
+        The plan is rebuilt by binary-searching the parents back through the
+        layer files. Spill files go to a temporary directory under
+        `spill_dir` and are removed afterwards.
+        """
+        self.stats = {"expanded": 0, "visited": 1, "peak_frontier": 1, "layers": 0, "runs": 0,
+                      "merge_passes": 0}
+        if self.goal_reached(self.world, goal):
+            return []
+        
+        start = self.encode(self.world)
+        goal_mask, goal_value = self.goal_pattern(goal)
+        width = (len(self.blocks) * self.field_bits + 7) // 8
+        # A buffered (child, parent) tuple with its two ints costs ~128 bytes
+        buffer_limit = max(1024, memory_limit // 128)
+        # Each open run reads ahead one chunk of READ_CHUNK records
+        fan_in = max(2, min(self.MERGE_FAN_IN, memory_limit // (READ_CHUNK * 2 * width)))
+        work_dir = tempfile.mkdtemp(prefix="blockworld_bfs_", dir=spill_dir)
+        
+        try:
+            layers = [os.path.join(work_dir, "layer_0")]
+            write_records(layers[0], [(start, start)], width)
+            
+            while True:
+                # 1. Expand the last layer into sorted runs of children
+                runs = []
+                buffer = []
+                for code, _ in read_records(layers[-1], width):
+                    self.stats["expanded"] += 1
+                    self.check_interrupt()
+                    for _, child in self.successors(code):
+                        buffer.append((child, code))
+                    if len(buffer) >= buffer_limit:
+                        runs.append(self.spill_run(work_dir, buffer, width))
+                        buffer = []
+                if buffer:
+                    runs.append(self.spill_run(work_dir, buffer, width))
+                self.stats["runs"] += len(runs)
+                
+                # 2. Merge runs into the next layer, dropping duplicates
+                path = os.path.join(work_dir, f"layer_{len(layers)}")
+                seen_before = [SortedRecordCursor(p, width) for p in layers[-2:]]
+                runs = self.merge_runs(work_dir, runs, width, fan_in)
+                merged = heapq.merge(*(read_records(run, width) for run in runs))
+                found = None
+                count = 0
+                with open(path, "wb") as f:
+                    last = None
+                    for child, parent in merged:
+                        if child == last:
+                            continue
+                        last = child
+                        if any(cursor.contains(child) for cursor in seen_before):
+                            continue
+                        f.write(child.to_bytes(width, "big") + parent.to_bytes(width, "big"))
+                        count += 1
+                        if self.is_goal(child, goal_mask, goal_value):
+                            found = (child, parent)
+                            break
+                for run in runs:
+                    os.remove(run)
+                
+                layers.append(path)
+                self.stats["layers"] = len(layers) - 1
+                self.stats["visited"] += count
+                self.stats["peak_frontier"] = max(self.stats["peak_frontier"], count)
+                if found is not None:
+                    return self.rebuild_plan_external(layers, found, width)
+                if count == 0:
+                    return None
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    
+    def spill_run(self, work_dir, buffer, width):
+        """Sort and write one buffer of (child, parent) pairs as a run file"""
+        buffer.sort()
+        fd, path = tempfile.mkstemp(prefix="run_", dir=work_dir)
+        os.close(fd)
+        write_records(path, buffer, width)
+        return path
+    
+    def merge_runs(self, work_dir, runs, width, fan_in):
+        """Merge sorted runs, `fan_in` at a time, until at most `fan_in` remain"""
+        while len(runs) > fan_in:
+            merged = []
+            for i in range(0, len(runs), fan_in):
+                group = runs[i:i + fan_in]
+                if len(group) == 1:
+                    merged.append(group[0])
+                    continue
+                fd, path = tempfile.mkstemp(prefix="run_", dir=work_dir)
+                os.close(fd)
+                write_records(path, heapq.merge(*(read_records(run, width) for run in group)), width)
+                for run in group:
+                    os.remove(run)
+                merged.append(path)
+            runs = merged
+            self.stats["merge_passes"] += 1
+        return runs
+    
+    def rebuild_plan_external(self, layers, found, width):
+        """Walk parent pointers back through the on-disk layers"""
+        child, parent = found
+        codes = [child]
+        for depth in range(len(layers) - 2, 0, -1):
+            codes.append(parent)
+            parent = find_parent(layers[depth], parent, width)
+        codes.append(parent)
+        codes.reverse()
+        return [self.action_between(a, b) for a, b in zip(codes, codes[1:])]
+    
+    def action_between(self, code, child):
+        """The action that turns state `code` into `child`"""
+        diff = code ^ child
+        i = (diff.bit_length() - 1) // self.field_bits
+        shift = i * self.field_bits
+        old = (code >> shift) & self.field_mask
+        new = (child >> shift) & self.field_mask
+        block = self.blocks[i]
+        if new == self.held_code:
+            return ("pick_up" if old == 0 else "unstack", block, None)
+        if new == 0:
+            return ("put_down", block, None)
+        return ("stack", block, self.blocks[new - 1])
+    
+    def goal_supports(self, goal):
+        """Per-block goal field values (None where the goal says nothing)"""
+        targets = [None] * len(self.blocks)
+        for block, target in goal.items():
+            targets[self.index[block]] = self.support_code(target)
+        return targets
+    
+    def make_heuristic(self, goal, kind="above_misplaced"):
+        """Admissible estimate of the actions left, as a function of a state code
+
+        misplaced:       2 per goal block not on its goal support (1 if it is
+                         already in the gripper, which only needs a put/stack)
+        above_misplaced: as above, but also counting every block that sits
+                         anywhere above a misplaced block, since it has to be
+                         moved out of the way first
+        Both also charge 1 for a held block the goal says nothing about,
+        because the plan has to end with an empty hand.
+        """
+        targets = self.goal_supports(goal)
+        held_code = self.held_code
+        count = len(self.blocks)
+        
+        if kind == "misplaced":
+            def misplaced(code):
+                supports = self.decode(code)
+                total = 0
+                for i in range(count):
+                    value = supports[i]
+                    if value == held_code:
+                        total += 1
+                    elif targets[i] is not None and value != targets[i]:
+                        total += 2
+                return total
+            return misplaced
+        
+        if kind != "above_misplaced":
+            raise ValueError(f"Unknown heuristic: {kind}")
+        
+        def above_misplaced(code):
+            supports = self.decode(code)
+            # must_move[i]: block i, or a block somewhere below it, is misplaced
+            must_move = [None] * count
+            total = 0
+            for i in range(count):
+                chain = []
+                j = i
+                while must_move[j] is None:
+                    value = supports[j]
+                    if value == held_code:
+                        must_move[j] = True
+                        break
+                    if targets[j] is not None and value != targets[j]:
+                        must_move[j] = True
+                        break
+                    if value == 0:
+                        must_move[j] = False
+                        break
+                    chain.append(j)
+                    j = value - 1
+                verdict = must_move[j]
+                for k in chain:
+                    must_move[k] = verdict
+                if must_move[i]:
+                    total += 1 if supports[i] == held_code else 2
+            return total
+        return above_misplaced
+    
+    def make_pdb_heuristic(self, databases, combine="add", goal=None):
+        """Heuristic over state codes from PatternDatabase lookups
+
+        combine="add" sums the databases, which is admissible when their
+        patterns are disjoint (every action moves one block, so it is paid
+        for in at most one abstraction); combine="max" takes the largest.
+        With a `goal`, the result is also maxed with above_misplaced.
+        """
+        lookups = [database.lookup_for(self) for database in databases]
+        if combine == "add":
+            seen = set()
+            for database in databases:
+                if seen & set(database.pattern):
+                    raise ValueError("Additive pattern databases need disjoint patterns")
+                seen |= set(database.pattern)
+            def pdb(code):
+                return sum(lookup(code) for lookup in lookups)
+        elif combine == "max":
+            def pdb(code):
+                return max(lookup(code) for lookup in lookups)
+        else:
+            raise ValueError(f"Unknown combination: {combine}")
+        if goal is None:
+            return pdb
+        base = self.make_heuristic(goal)
+        return lambda code: max(pdb(code), base(code))
+    
+    def rebuild_plan(self, parents, code):
+        """Follow parent pointers back from `code` to the start"""
+        plan = []
+        while parents[code] is not None:
+            parent = parents[code]
+            plan.append(self.action_between(parent, code))
+            code = parent
+        plan.reverse()
+        return plan
+    
+    def plan_astar(self, goal, heuristic="above_misplaced"):
+        """A* search for an optimal plan
+
+        `heuristic` is a name accepted by make_heuristic or a function of a
+        state code. self.stats records nodes expanded and the peak size of the
+        open list for this call.
+        """
+        self.stats = {"expanded": 0, "visited": 1, "peak_frontier": 0}
+        h = heuristic if callable(heuristic) else self.make_heuristic(goal, heuristic)
+        start = self.encode(self.world)
+        goal_mask, goal_value = self.goal_pattern(goal)
+        tie = itertools.count()
+        
+        best_g = {start: 0}
+        parents = {start: None}
+        frontier = [(h(start), 0, next(tie), start)]
+        
+        while frontier:
+            if len(frontier) > self.stats["peak_frontier"]:
+                self.stats["peak_frontier"] = len(frontier)
+            _, neg_g, _, code = heapq.heappop(frontier)
+            g = -neg_g
+            if g > best_g[code]:
+                continue  # Stale entry, a shorter path was found later
+            if code & goal_mask == goal_value and self.held_code not in self.decode(code):
+                self.stats["visited"] = len(best_g)
+                return self.rebuild_plan(parents, code)
+            self.stats["expanded"] += 1
+            self.check_interrupt()
+            
+            for action, new_code in self.successors(code):
+                new_g = g + 1
+                if new_g < best_g.get(new_code, new_g + 1):
+                    best_g[new_code] = new_g
+                    parents[new_code] = code
+                    # Ties on f prefer deeper nodes, which reach the goal sooner
+                    heapq.heappush(frontier, (new_g + h(new_code), -new_g, next(tie), new_code))
+        
+        self.stats["visited"] = len(best_g)
+        return None
+    
+    def plan_idastar(self, goal, heuristic="above_misplaced"):
+        """Iterative-deepening A*: optimal like A*, memory linear in plan length
+
+        self.stats["peak_frontier"] is the deepest search path held in memory.
+        """
+        self.stats = {"expanded": 0, "peak_frontier": 0, "iterations": 0}
+        h = heuristic if callable(heuristic) else self.make_heuristic(goal, heuristic)
+        start = self.encode(self.world)
+        goal_mask, goal_value = self.goal_pattern(goal)
+        held_code = self.held_code
+        path_codes = {start}
+        plan = []
+        
+        def search(code, g, bound):
+            """Returns True when a plan is found, else the smallest f above bound"""
+            f = g + h(code)
+            if f > bound:
+                return f
+            if code & goal_mask == goal_value and held_code not in self.decode(code):
+                return True
+            self.stats["expanded"] += 1
+            self.check_interrupt()
+            if len(plan) >= self.stats["peak_frontier"]:
+                self.stats["peak_frontier"] = len(plan) + 1
+            smallest = None
+            for action, new_code in self.successors(code):
+                if new_code in path_codes:
+                    continue
+                path_codes.add(new_code)
+                plan.append(action)
+                result = search(new_code, g + 1, bound)
+                if result is True:
+                    return True
+                plan.pop()
+                path_codes.discard(new_code)
+                if result is not None and (smallest is None or result < smallest):
+                    smallest = result
+            return smallest
         
+        bound = h(start)
+        while bound is not None:
+            self.stats["iterations"] += 1
+            result = search(start, 0, bound)
+            if result is True:
+                return plan
+            bound = result
         return None
 
 
+class PatternDatabase:
+    """Exact goal distances for an abstraction that only keeps some blocks
+
+    Each of the k pattern blocks keeps its support: the table, another
+    pattern block, the gripper, or OTHER (some block outside the pattern).
+    Non-pattern blocks are otherwise invisible, and holding one counts as an
+    empty hand. Every real plan maps onto an abstract plan that is no
+    longer, so the abstract distance is an admissible heuristic. Distances
+    come from a backward BFS from all abstract goal states, regressing
+    through pick_up/put_down/stack/unstack, and are stored one byte per
+    abstract state, indexed in base (k + 3) over the pattern blocks.
+    """
+    
+    MAGIC = b"BWPDB"
+    VERSION = 1
+    HEADER = struct.Struct("<5sHI")
+    UNREACHED = 255
+    
+    def __init__(self, pattern, goal, distances, mapped=None):
+        self.pattern = list(pattern)
+        self.goal = dict(goal)
+        self.distances = distances
+        self.mapped = mapped
+        # Abstract support values: 0 table, j + 1 pattern block j, HELD, OTHER
+        self.held = len(self.pattern) + 1
+        self.other = len(self.pattern) + 2
+        self.base = len(self.pattern) + 3
+    
+    @classmethod
+    def build(cls, pattern, goal):
+        """Solve the abstract problem over `pattern` for the full `goal`"""
+        pattern = list(pattern)
+        position = {block: j for j, block in enumerate(pattern)}
+        count = len(pattern)
+        held, other, base = count + 1, count + 2, count + 3
+        targets = [None] * count
+        for block, target in goal.items():
+            if block in position:
+                if target == "table":
+                    targets[position[block]] = 0
+                elif target in position:
+                    targets[position[block]] = position[target] + 1
+                else:
+                    targets[position[block]] = other
+        
+        def index(supports):
+            value = 0
+            for support in reversed(supports):
+                value = value * base + support
+            return value
+        
+        def neighbours(supports):
+            """Abstract states one action away; the action set is closed under
+            inverses, so these are also the regression predecessors"""
+            covered = {value for value in supports if 0 < value < held}
+            if held in supports:
+                i = supports.index(held)
+                for value in [0, other] + [j + 1 for j in range(count) if j != i and j + 1 not in covered]:
+                    yield supports[:i] + [value] + supports[i + 1:]
+            else:
+                for i in range(count):
+                    if i + 1 not in covered:
+                        yield supports[:i] + [held] + supports[i + 1:]
+        
+        # Abstract goal states: hand empty, goal supports, any valid layout otherwise
+        goal_states = []
+        supports = [0] * count
+        
+        def assign(i, used):
+            if i == count:
+                for j in range(count):
+                    seen = set()
+                    while 0 < supports[j] < held:
+                        if j in seen:
+                            return
+                        seen.add(j)
+                        j = supports[j] - 1
+                goal_states.append(list(supports))
+                return
+            options = [targets[i]] if targets[i] is not None else [0, other] + list(range(1, count + 1))
+            for value in options:
+                if value == i + 1 or (0 < value < held and value in used):
+                    continue
+                supports[i] = value
+                assign(i + 1, used | {value} if 0 < value < held else used)
+        
+        assign(0, frozenset())
+        distances = bytearray([cls.UNREACHED]) * (base ** count)
+        queue = deque()
+        for state in goal_states:
+            distances[index(state)] = 0
+            queue.append(state)
+        while queue:
+            state = queue.popleft()
+            distance = min(distances[index(state)] + 1, cls.UNREACHED - 1)
+            for parent in neighbours(state):
+                i = index(parent)
+                if distances[i] == cls.UNREACHED:
+                    distances[i] = distance
+                    queue.append(parent)
+        return cls(pattern, goal, distances)
+    
+    def save(self, path):
+        meta = json.dumps({"pattern": self.pattern, "goal": self.goal}).encode()
+        with open(path, "wb") as f:
+            f.write(self.HEADER.pack(self.MAGIC, self.VERSION, len(meta)))
+            f.write(meta)
+            f.write(self.distances)
+    
+    @classmethod
+    def load(cls, path):
+        """Memory-map a database written by save()
+
+        Raises ValueError for a file that is not a complete database; the
+        mapping is closed again on every error.
+        """
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size < cls.HEADER.size:
+                raise ValueError(f"{path}: corrupt pattern database")
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            pattern, goal, start = cls.read_header(mapped, path)
+        except ValueError:
+            mapped.close()
+            raise
+        distances = memoryview(mapped)[start:]
+        return cls(pattern, goal, distances, mapped)
+    
+    @classmethod
+    def read_header(cls, mapped, path):
+        """(pattern, goal, table offset) of a mapped database, checked against its size"""
+        magic, version, meta_size = cls.HEADER.unpack_from(mapped, 0)
+        if magic != cls.MAGIC or version != cls.VERSION:
+            raise ValueError(f"{path}: not a version {cls.VERSION} pattern database")
+        start = cls.HEADER.size + meta_size
+        if start > len(mapped):
+            raise ValueError(f"{path}: corrupt pattern database")
+        try:
+            meta = json.loads(mapped[cls.HEADER.size:start].decode())
+            pattern, goal = list(meta["pattern"]), dict(meta["goal"])
+        except (ValueError, KeyError, TypeError) as e:
+            raise ValueError(f"{path}: corrupt pattern database") from e
+        if len(mapped) - start != (len(pattern) + 3) ** len(pattern):
+            raise ValueError(f"{path}: corrupt pattern database")
+        return pattern, goal, start
+    
+    def close(self):
+        if self.mapped is not None:
+            self.distances.release()
+            self.mapped.close()
+            self.mapped = None
+    
+    def lookup_for(self, agent):
+        """Function mapping one of `agent`'s state codes to its abstract distance"""
+        position = {block: i for i, block in enumerate(self.pattern)}
+        # value_map[v]: abstract support for a concrete field value v
+        value_map = [0] * (agent.held_code + 1)
+        for t, block in enumerate(agent.blocks):
+            value_map[t + 1] = position[block] + 1 if block in position else self.other
+        value_map[agent.held_code] = self.held
+        fields = [(agent.index[block] * agent.field_bits, self.base ** j)
+                  for j, block in enumerate(self.pattern)]
+        mask = agent.field_mask
+        distances = self.distances
+        
+        def lookup(code):
+            index = 0
+            for shift, weight in fields:
+                index += value_map[(code >> shift) & mask] * weight
+            return distances[index]
+        return lookup
+
+
+def split_pattern(blocks, size):
+    """Disjoint patterns of at most `size` blocks covering `blocks`"""
+    blocks = list(blocks)
+    return [blocks[i:i + size] for i in range(0, len(blocks), size)]
+
+
+def goal_patterns(blocks, goal, size):
+    """Disjoint patterns that follow the goal towers bottom-up
+
+    Keeping a block together with its goal support lets the abstraction see
+    whether the block sits on the right thing, which is what makes it
+    informative; blocks the goal does not mention go last.
+    """
+    above = {target: block for block, target in goal.items() if target != "table"}
+    order = []
+    for block in blocks:
+        if goal.get(block) == "table":
+            while block is not None:
+                order.append(block)
+                block = above.get(block)
+    order += [block for block in blocks if block not in order]
+    return split_pattern(order, size)
+
+
+def benchmark_pattern_databases(sizes=(12, 15), seeds=range(3), pattern_size=6):
+    """Compare A* nodes expanded: above_misplaced vs additive / max pattern databases"""
+    print(f"{'blocks':>6} {'seed':>4} {'len':>4} {'heuristic':>16} {'expanded':>9} {'seconds':>8}")
+    for count in sizes:
+        for seed in seeds:
+            on, goal = random_problem(count, seed)
+            agent = BlockWorldAgent(BlockWorld(on))
+            start = time.perf_counter()
+            patterns = goal_patterns(agent.blocks, goal, pattern_size)
+            databases = [PatternDatabase.build(p, goal) for p in patterns]
+            build_time = time.perf_counter() - start
+            runs = [
+                ("above_misplaced", "above_misplaced"),
+                ("pdb add", agent.make_pdb_heuristic(databases, "add", goal)),
+                ("pdb max", agent.make_pdb_heuristic(databases, "max", goal)),
+            ]
+            for name, heuristic in runs:
+                start = time.perf_counter()
+                plan = agent.plan_astar(goal, heuristic)
+                elapsed = time.perf_counter() - start
+                print(f"{count:>6} {seed:>4} {len(plan):>4} {name:>16} "
+                      f"{agent.stats['expanded']:>9} {elapsed:>8.2f}")
+            print(f"{'':>6} {'':>4} {'':>4} {'(pdb build)':>16} {'':>9} {build_time:>8.2f}")
+
+
+class BadProblem:
+    """Stands in for a batch input line that could not be read as a problem"""
+    
+    def __init__(self, problem_id, error):
+        self.id = problem_id
+        self.error = error
+
+
+def problem_error(problem):
+    """Why `problem` is not a valid {"id", "on", "goal"} record, or None"""
+    if not isinstance(problem, dict):
+        return "Problem is not a JSON object"
+    for field in ("on", "goal"):
+        if not isinstance(problem.get(field), dict) or not problem[field]:
+            return f"Problem field {field!r} must be a non-empty object"
+    return None
+
+
+def solve_problem(problem, method="astar", timeout=None):
+    """Solve one batch problem {"id", "on", "goal"} and describe the outcome
+
+    Runs in a worker process. `timeout` (seconds) becomes the agent's
+    deadline, so a slow search stops itself and reports "timeout". Invalid
+    problems, BadProblem lines and any exception while solving are reported
+    as "error" so one bad record cannot stop the batch.
+    """
+    if isinstance(problem, BadProblem):
+        problem_id, error = problem.id, problem.error
+    else:
+        problem_id, error = problem.get("id"), problem_error(problem)
+    result = {"id": problem_id, "status": "solved", "plan": None, "length": None,
+              "expanded": 0, "time": 0.0}
+    if error is not None:
+        result.update(status="error", error=error)
+        return result
+    start = time.perf_counter()
+    agent = None
+    try:
+        agent = BlockWorldAgent(BlockWorld(problem["on"]))
+        if timeout is not None:
+            agent.deadline = start + timeout
+        plan = agent.plan(problem["goal"], method)
+        if plan is None:
+            result["status"] = "no_plan"
+        else:
+            result["plan"] = [list(action) for action in plan]
+            result["length"] = len(plan)
+    except PlanningCancelled:
+        result["status"] = "timeout"
+    except Exception as e:
+        result["status"] = "error"
+        result["error"] = f"{type(e).__name__}: {e}"
+    if agent is not None:
+        result["expanded"] = agent.stats.get("expanded", 0)
+    result["time"] = round(time.perf_counter() - start, 6)
+    return result
+
+
+def read_problems(path):
+    """Yield problems from a JSONL file (or stdin for "-"), skipping blank lines
+
+    A line that is not valid JSON yields a BadProblem instead, so one bad
+    line does not stop the batch; solve_problem reports it as an error.
+    """
+    f = sys.stdin if path == "-" else open(path)
+    try:
+        for number, line in enumerate(f, 1):
+            if line.strip():
+                try:
+                    problem = json.loads(line)
+                except ValueError as e:
+                    yield BadProblem(number, f"{type(e).__name__}: {e}")
+                    continue
+                if not isinstance(problem, dict):
+                    yield BadProblem(number, "Problem is not a JSON object")
+                    continue
+                problem.setdefault("id", number)
+                yield problem
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def run_batch(input_path, output_path="-", method="astar", timeout=None, workers=None):
+    """Solve every problem in `input_path` across a process pool
+
+    Results are written to `output_path` as JSONL in completion order, one
+    line per problem as soon as it finishes. Returns the number solved.
+    """
+    solve = functools.partial(solve_problem, method=method, timeout=timeout)
+    out = sys.stdout if output_path == "-" else open(output_path, "w")
+    solved = 0
+    try:
+        with multiprocessing.Pool(workers) as pool:
+            for result in pool.imap_unordered(solve, read_problems(input_path)):
+                out.write(json.dumps(result) + "\n")
+                out.flush()
+                if result["status"] == "solved":
+                    solved += 1
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return solved
+
+
+def write_records(path, records, width):
+    """Write (state, parent) code pairs as fixed-width big-endian records"""
+    with open(path, "wb") as f:
+        for code, parent in records:
+            f.write(code.to_bytes(width, "big") + parent.to_bytes(width, "big"))
+
+
+def read_records(path, width, chunk_records=READ_CHUNK):
+    """Stream (state, parent) pairs back from a record file"""
+    size = 2 * width
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(size * chunk_records)
+            if not chunk:
+                return
+            for offset in range(0, len(chunk), size):
+                yield (int.from_bytes(chunk[offset:offset + width], "big"),
+                       int.from_bytes(chunk[offset + width:offset + size], "big"))
+
+
+def find_parent(path, code, width):
+    """Binary search a sorted record file for `code` and return its parent"""
+    size = 2 * width
+    with open(path, "rb") as f:
+        low, high = 0, os.path.getsize(path) // size
+        while low < high:
+            middle = (low + high) // 2
+            f.seek(middle * size)
+            record = f.read(size)
+            value = int.from_bytes(record[:width], "big")
+            if value == code:
+                return int.from_bytes(record[width:], "big")
+            if value < code:
+                low = middle + 1
+            else:
+                high = middle
+    raise KeyError(code)
+
+
+class SortedRecordCursor:
+    """Membership tests against a sorted record file for increasing queries"""
+    
+    def __init__(self, path, width):
+        self.records = read_records(path, width)
+        self.current = next(self.records, None)
+    
+    def contains(self, code):
+        while self.current is not None and self.current[0] < code:
+            self.current = next(self.records, None)
+        return self.current is not None and self.current[0] == code
+
+
 class BlockWorld:
-    def __init__(self):
-        self.on = {"A": "table", "B": "table", "C": "A"}
-        self.clear = {"A": False, "B": True, "C": True}
-        self.holding = None
-
-    def pick_up(self, block):
-        if self.holding is None and self.on[block] == "table" and self.clear[block]:
-            self.holding = block
+    def __init__(self, on=None, arms=1):
+        """`on` maps every block to "table" or the block it sits on; `arms` grippers"""
+        self.initial_on = dict(DEFAULT_LAYOUT if on is None else on)
+        self.blocks = list(self.initial_on)
+        self.arm_count = arms
+        for block, target in self.initial_on.items():
+            if target != "table" and target not in self.initial_on:
+                raise ValueError(f"{block} is on unknown block {target}")
+        supports = [t for t in self.initial_on.values() if t != "table"]
+        if len(supports) != len(set(supports)):
+            raise ValueError("Two blocks cannot sit on the same block")
+        for block in self.blocks:
+            seen = set()
+            while block != "table":
+                if block in seen:
+                    raise ValueError("Layout contains a cycle")
+                seen.add(block)
+                block = self.initial_on[block]
+        self.reset()
+
+    @property
+    def holding(self):
+        """Block in the first arm (the only arm of a single-arm world)"""
+        return self.arms[0]
+
+    @holding.setter
+    def holding(self, block):
+        self.arms[0] = block
+
+    def pick_up(self, block, arm=0):
+        if self.arms[arm] is None and self.on[block] == "table" and self.clear[block]:
+            self.arms[arm] = block
             self.on[block] = None
             self.clear[block] = True
             return True, f"Picked up {block}"
         return False, f"Cannot pick up {block}"
 
-    def put_down(self, block):
-        if self.holding == block:
+    def put_down(self, block, arm=0):
+        if self.arms[arm] == block:
             self.on[block] = "table"
-            self.holding = None
+            self.arms[arm] = None
             return True, f"Put down {block} on table"
         return False, f"Cannot put down {block}"
 
-    def stack(self, block, target):
-        if self.holding == block and self.clear[target]:
+    def stack(self, block, target, arm=0):
+        if self.arms[arm] == block and self.clear[target] and target not in self.arms:
             self.on[block] = target
             self.clear[target] = False
-            self.holding = None
+            self.arms[arm] = None
             return True, f"Stacked {block} on {target}"
         return False, f"Cannot stack {block} on {target}"
 
-    def unstack(self, block):
+    def unstack(self, block, arm=0):
         target = self.on[block]
-        if target and target != "table" and self.clear[block] and self.holding is None:
-            self.holding = block
+        if target and target != "table" and self.clear[block] and self.arms[arm] is None:
+            self.arms[arm] = block
             self.on[block] = None
             self.clear[target] = True
             return True, f"Unstacked {block} from {target}"
         return False, f"Cannot unstack {block}"
 
     def reset(self):
-        self.on = {"A": "table", "B": "table", "C": "A"}
-        self.clear = {"A": False, "B": True, "C": True}
-        self.holding = None
+        self.on = dict(self.initial_on)
+        self.clear = {block: True for block in self.blocks}
+        for target in self.on.values():
+            if target != "table":
+                self.clear[target] = False
+        self.arms = [None] * self.arm_count
 
 
 class BlockWorldGUI:
-    def __init__(self, root):
+    def __init__(self, root, world=None, goals=None):
         self.root = root
         self.root.title("Block World AI Agent - Autonomous Solver")
         self.root.geometry("750x580")
         self.root.configure(bg="#1a1a2e")
         
-        self.world = BlockWorld()
-        self.agent = BlockWorldAgent(self.world)
-        self.block_colors = {"A": "#e94560", "B": "#0f3460", "C": "#16c79a"}
-        self.block_size = 70
-        self.table_positions = {"A": 150, "B": 350, "C": 550}
+        self.world = world or BlockWorld()
+        # Goals cycle from the same states, so plans are reused across cycles
+        self.plan_cache = PlanCache()
+        self.agent = BlockWorldAgent(self.world, self.plan_cache)
+        blocks = self.world.blocks
+        self.block_colors = {block: BLOCK_PALETTE[i % len(BLOCK_PALETTE)] for i, block in enumerate(blocks)}
+        self.block_size = min(70, 600 // len(blocks))
+        slot_width = 660 / len(blocks)
+        self.table_positions = {block: int(20 + slot_width * (i + 0.5)) for i, block in enumerate(blocks)}
         self.current_plan = []
         
-        self.goals = [
+        self.goals = goals or [
             ("Build A-B-C Tower", {"A": "table", "B": "A", "C": "B"}),
             ("Build C-B-A Tower", {"A": "B", "B": "C", "C": "table"}),
             ("All Blocks on Table", {"A": "table", "B": "table", "C": "table"}),
         ]
         self.current_goal_index = 0
         self.is_running = False
+        # Background planning: the worker thread fills planning_result
+        self.planning_agent = None
+        self.planning_result = None
+        # Persistent canvas items and where they are currently drawn
+        self.block_items = {}
+        self.block_positions = {}
+        self.arm_items = {}
+        self.arm_positions = {}
+        self.drawn_arms = list(self.world.arms)
+        self.animation_frames = 10
+        self.animation_interval = 30
+        self.animation_job = None
+        self.animation_target = None
         
         self.setup_ui()
         self.draw_state()
@@ -223,41 +1607,143 @@ class BlockWorldGUI:
                                      padx=30, pady=10, cursor="hand2")
         self.restart_btn.pack(side="left", padx=10)
 
-    def draw_state(self):
-        self.canvas.delete("block")
-        block_positions = {}
-        
-        for block in ["A", "B", "C"]:
+    def block_layout(self):
+        """Top-left anchor (x, y) of every block, computed in one pass up each tower"""
+        above = {}
+        for block in self.world.blocks:
+            target = self.world.on[block]
+            if target and target != "table":
+                above[target] = block
+        positions = {}
+        for block in self.world.blocks:
             if self.world.on[block] == "table":
                 x = self.table_positions[block]
                 y = 230 - self.block_size
-                block_positions[block] = (x, y)
-            elif self.world.on[block] is None and self.world.holding == block:
-                block_positions[block] = (350, 30)
-        
-        for _ in range(3):
-            for block in ["A", "B", "C"]:
-                target = self.world.on[block]
-                if target and target != "table" and target in block_positions and block not in block_positions:
-                    base_x, base_y = block_positions[target]
-                    block_positions[block] = (base_x, base_y - self.block_size)
+                while block is not None:
+                    positions[block] = (x, y)
+                    y -= self.block_size
+                    block = above.get(block)
+        for arm, block in enumerate(self.world.arms):
+            if block is not None:
+                positions[block] = self.arm_home(arm, 30)
+        return positions
+
+    def arm_home(self, arm, y=20):
+        return (700 * (arm + 1) // (self.world.arm_count + 1), y)
+
+    def draw_state(self, animate=False):
+        """Move the persistent block and arm items to the world's current state
+
+        Items are created once and only those whose position changed are
+        moved, so a redraw costs the same however many blocks are on the
+        table. With `animate`, each arm that moved a block first travels to
+        it and then carries it to its new place.
+        """
+        if self.animation_job is not None:
+            self.root.after_cancel(self.animation_job)
+            self.animation_job = None
+            self.place_items(self.animation_target)
+        targets = self.block_layout()
+        arm_targets = dict(self.arm_positions)
+        carried = {}
+        for arm, block in enumerate(self.world.arms):
+            if block is not None:
+                arm_targets[arm] = targets[block]
+        for arm, block in enumerate(self.drawn_arms):
+            if block is not None and block not in self.world.arms:
+                arm_targets[arm] = targets[block]
+                carried[arm] = block
+        for arm, block in enumerate(self.world.arms):
+            if block is not None and self.drawn_arms[arm] != block:
+                carried[arm] = block
+        if not animate:
+            for arm in range(self.world.arm_count):
+                if self.world.arms[arm] is None:
+                    arm_targets[arm] = self.arm_home(arm)
+        target = (targets, arm_targets)
+        self.drawn_arms = list(self.world.arms)
         
-        for block, (x, y) in block_positions.items():
-            self.draw_block(block, x, y)
+        if animate and carried:
+            blocks_from = dict(self.block_positions)
+            arms_from = dict(self.arm_positions)
+            reach = dict(arms_from)
+            for arm, block in carried.items():
+                reach[arm] = blocks_from[block]
+            phases = [((blocks_from, reach), target, list(carried.values()))]
+            if reach != arms_from:
+                phases.insert(0, ((blocks_from, arms_from), (blocks_from, reach), ()))
+            self.animation_target = target
+            self.animate(phases, 0, 1)
+        else:
+            self.place_items(target)
         
-        holding_text = self.world.holding if self.world.holding else "None"
+        if self.world.arm_count == 1:
+            holding_text = self.world.holding if self.world.holding else "None"
+        else:
+            holding_text = ", ".join(f"arm {arm + 1}: {block or 'None'}"
+                                     for arm, block in enumerate(self.world.arms))
         self.holding_label.config(text=f"Holding: {holding_text}")
 
-    def draw_block(self, block, x, y):
+    def animate(self, phases, phase, frame):
+        """Interpolate one frame of a phase: ((blocks, arms) from, (blocks, arms) to, moving blocks)"""
+        (blocks_from, arms_from), (blocks_to, arms_to), moving = phases[phase]
+        t = frame / self.animation_frames
+        t = t * t * (3 - 2 * t)
+        
+        def between(a, b):
+            return (a[0] + (b[0] - a[0]) * t, a[1] + (b[1] - a[1]) * t)
+        
+        blocks = {block: between(blocks_from[block], blocks_to[block]) for block in moving}
+        arms = {arm: between(arms_from[arm], arms_to[arm]) for arm in arms_to}
+        self.place_items((blocks, arms))
+        if frame < self.animation_frames:
+            phase_frame = (phase, frame + 1)
+        elif phase + 1 < len(phases):
+            phase_frame = (phase + 1, 1)
+        else:
+            self.animation_job = None
+            self.place_items(phases[phase][1])
+            return
+        self.animation_job = self.root.after(self.animation_interval,
+                                             lambda: self.animate(phases, *phase_frame))
+
+    def place_items(self, layout):
+        """Move block and arm items whose position differs from what is drawn"""
+        blocks, arms = layout
+        half = self.block_size // 2
+        for block, (x, y) in blocks.items():
+            if self.block_positions.get(block) == (x, y):
+                continue
+            if block not in self.block_items:
+                self.block_items[block] = self.create_block_items(block)
+            shadow, body, label = self.block_items[block]
+            self.canvas.coords(shadow, x - half + 3, y + 3, x + half + 3, y + self.block_size + 3)
+            self.canvas.coords(body, x - half, y, x + half, y + self.block_size)
+            self.canvas.coords(label, x, y + half)
+            self.block_positions[block] = (x, y)
+        for arm, (x, y) in arms.items():
+            if self.arm_positions.get(arm) == (x, y) and arm in self.arm_items:
+                continue
+            if arm not in self.arm_items:
+                self.arm_items[arm] = self.create_arm_items()
+            cable, gripper = self.arm_items[arm]
+            self.canvas.coords(cable, x, 0, x, y - 6)
+            self.canvas.coords(gripper, x - half - 4, y - 8, x + half + 4, y)
+            self.arm_positions[arm] = (x, y)
+
+    def create_block_items(self, block):
         color = self.block_colors[block]
-        self.canvas.create_rectangle(x - self.block_size//2 + 3, y + 3,
-                                     x + self.block_size//2 + 3, y + self.block_size + 3,
-                                     fill="#0a0a1a", outline="", tags="block")
-        self.canvas.create_rectangle(x - self.block_size//2, y,
-                                     x + self.block_size//2, y + self.block_size,
-                                     fill=color, outline="#eaeaea", width=2, tags="block")
-        self.canvas.create_text(x, y + self.block_size//2, text=block,
-                               font=("Segoe UI", 24, "bold"), fill="white", tags="block")
+        shadow = self.canvas.create_rectangle(0, 0, 0, 0, fill="#0a0a1a", outline="", tags="block")
+        body = self.canvas.create_rectangle(0, 0, 0, 0, fill=color, outline="#eaeaea", width=2, tags="block")
+        label = self.canvas.create_text(0, 0, text=block,
+                                        font=("Segoe UI", max(8, self.block_size // 3), "bold"),
+                                        fill="white", tags="block")
+        return shadow, body, label
+
+    def create_arm_items(self):
+        cable = self.canvas.create_line(0, 0, 0, 0, fill="#6a6a8a", width=3, tags="arm")
+        gripper = self.canvas.create_rectangle(0, 0, 0, 0, fill="#f39c12", outline="#eaeaea", tags="arm")
+        return cable, gripper
 
     def format_action(self, action):
         action_type, block, target = action
@@ -271,6 +1757,24 @@ class BlockWorldGUI:
             return f"stack({block}, {target})"
         return str(action)
 
+    def format_step(self, step):
+        """A plan entry: one action, or a parallel step of (arm, action) pairs"""
+        if isinstance(step[0], str):
+            return self.format_action(step)
+        return " | ".join(f"{arm + 1}:{self.format_action(action)}" for arm, action in step)
+
+    def apply_action(self, action, arm=0):
+        action_type, block, target = action
+        if action_type == "pick_up":
+            return self.world.pick_up(block, arm)
+        elif action_type == "put_down":
+            return self.world.put_down(block, arm)
+        elif action_type == "unstack":
+            return self.world.unstack(block, arm)
+        elif action_type == "stack":
+            return self.world.stack(block, target, arm)
+        return False, f"Unknown action {action_type}"
+
     def start_agent(self):
         """Start the agent when button is clicked"""
         if not self.is_running:
@@ -281,6 +1785,9 @@ class BlockWorldGUI:
     def restart_agent(self):
         """Restart the agent from beginning"""
         self.is_running = False
+        if self.planning_agent is not None:
+            self.planning_agent.cancel()
+            self.planning_agent = None
         self.current_goal_index = 0
         self.current_plan = []
         self.world.reset()
@@ -297,11 +1804,42 @@ class BlockWorldGUI:
         
         self.goal_label.config(text=f"Goal: {goal_name}")
         self.status_label.config(text="Agent Planning...", fg="#f39c12")
-        self.root.update()
-        
-        self.agent = BlockWorldAgent(self.world)
-        plan = self.agent.plan_bfs(goal)
         
+        # Plan on a snapshot of the world in a worker thread so the event loop keeps running
+        snapshot = BlockWorldAgent.clone_world(self.world)
+        self.agent = BlockWorldAgent(snapshot, self.plan_cache)
+        self.planning_agent = self.agent
+        self.planning_result = {}
+        worker = threading.Thread(target=self.run_planner,
+                                  args=(self.agent, goal, self.planning_result), daemon=True)
+        worker.start()
+        self.root.after(100, lambda: self.poll_planner(self.agent, worker))
+
+    def run_planner(self, agent, goal, result):
+        """Worker thread body: never touches Tk, only fills `result`"""
+        try:
+            method = "parallel" if agent.world.arm_count > 1 else "bfs"
+            result["plan"] = agent.plan(goal, method)
+        except PlanningCancelled:
+            result["cancelled"] = True
+
+    def poll_planner(self, agent, worker):
+        """Show planner progress until the worker finishes, then act on the plan"""
+        if agent is not self.planning_agent:
+            return  # Cancelled by RESTART
+        if worker.is_alive():
+            stats = agent.stats
+            self.status_label.config(
+                text=f"Agent Planning... {stats.get('expanded', 0)} nodes expanded, "
+                     f"frontier {stats.get('peak_frontier', 0)}", fg="#f39c12")
+            self.root.after(100, lambda: self.poll_planner(agent, worker))
+            return
+        self.planning_agent = None
+        if self.planning_result.get("cancelled") or not self.is_running:
+            return
+        self.finish_planning(self.planning_result["plan"])
+
+    def finish_planning(self, plan):
         if plan is None:
             self.status_label.config(text="No solution exists!", fg="#e94560")
             self.root.after(2000, self.move_to_next_goal)
@@ -311,35 +1849,34 @@ class BlockWorldGUI:
             self.root.after(2000, self.move_to_next_goal)
         else:
             self.current_plan = plan
-            plan_str = " -> ".join([self.format_action(a) for a in plan])
+            plan_str = " -> ".join([self.format_step(step) for step in plan])
             self.plan_label.config(text=f"Plan: {plan_str}")
             self.status_label.config(text=f"Executing plan ({len(plan)} steps)...", fg="#16c79a")
             self.root.after(1000, lambda: self.execute_plan_step(0))
 
     def execute_plan_step(self, index):
+        if not self.is_running:
+            return
         if index >= len(self.current_plan):
             self.status_label.config(text="Goal Achieved! Press RESTART to try again.", fg="#16c79a")
             self.is_running = False
             self.start_btn.config(state="normal", bg="#16c79a")
             return
         
-        action = self.current_plan[index]
-        action_type, block, target = action
-        
-        if action_type == "pick_up":
-            success, msg = self.world.pick_up(block)
-        elif action_type == "put_down":
-            success, msg = self.world.put_down(block)
-        elif action_type == "unstack":
-            success, msg = self.world.unstack(block)
-        elif action_type == "stack":
-            success, msg = self.world.stack(block, target)
+        step = self.current_plan[index]
+        if isinstance(step[0], str):
+            success, msg = self.apply_action(step)
+        else:
+            # Actions in a parallel step touch disjoint blocks, so they apply in any order
+            results = [self.apply_action(action, arm) for arm, action in step]
+            success = all(ok for ok, _ in results)
+            msg = "; ".join(f"arm {arm + 1}: {text}" for (arm, _), (_, text) in zip(step, results))
         
         step_num = index + 1
         total = len(self.current_plan)
         self.status_label.config(text=f"Step {step_num}/{total}: {msg}", 
                                 fg="#16c79a" if success else "#e94560")
-        self.draw_state()
+        self.draw_state(animate=True)
         self.root.after(1000, lambda: self.execute_plan_step(index + 1))
 
     def move_to_next_goal(self):
@@ -354,7 +1891,32 @@ class BlockWorldGUI:
             self.start_next_goal()
 
 
-if __name__ == "__main__":
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Block World AI Agent (GUI by default)")
+    parser.add_argument("--batch", metavar="PROBLEMS",
+                        help='solve a JSONL file of {"id", "on", "goal"} problems headlessly ("-" for stdin)')
+    parser.add_argument("--output", "-o", default="-", help="JSONL results file (default: stdout)")
+    parser.add_argument("--method", default="astar",
+                        choices=["bfs", "astar", "idastar", "bidirectional"], help="planner to use")
+    parser.add_argument("--timeout", type=float, default=None, help="per-problem time limit in seconds")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all CPUs)")
+    parser.add_argument("--bench-pdb", action="store_true", help="benchmark pattern-database heuristics")
+    parser.add_argument("--arms", type=int, default=1, help="robot arms in the GUI world (plans run in parallel)")
+    args = parser.parse_args(argv)
+    
+    if args.bench_pdb:
+        benchmark_pattern_databases()
+        return 0
+    if args.batch:
+        run_batch(args.batch, args.output, args.method, args.timeout, args.workers)
+        return 0
+    if tk is None:
+        parser.error("tkinter is not available; use --batch for headless planning")
     root = tk.Tk()
-    app = BlockWorldGUI(root)
+    app = BlockWorldGUI(root, BlockWorld(arms=args.arms))
     root.mainloop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,50 +1,836 @@
-def calculate_heuristic(board, player):
+import math
+import mmap
+import os
+import random
+import struct
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import numpy as np
+except ImportError:  # numpy is only needed for batch evaluation
+    np = None
+
+# ==========================================
+# Bitboard Representation
+# ==========================================
+
+# Each player's pieces are stored as a 9-bit mask; cell (r, c) is bit r*3 + c.
+EMPTY = '-'
+
+
+def cell_bit(row, col):
+    """Bit for the cell at (row, col)"""
+    return 1 << (row * 3 + col)
+
+
+# The 8 winning lines (3 rows, 3 cols, 2 diagonals), built once at import
+WIN_MASKS = (
+    [cell_bit(r, 0) | cell_bit(r, 1) | cell_bit(r, 2) for r in range(3)] +
+    [cell_bit(0, c) | cell_bit(1, c) | cell_bit(2, c) for c in range(3)] +
+    [cell_bit(0, 0) | cell_bit(1, 1) | cell_bit(2, 2),
+     cell_bit(0, 2) | cell_bit(1, 1) | cell_bit(2, 0)]
+)
+
+FULL_BOARD = (1 << 9) - 1
+
+# OPEN_LINES[bits] = number of winning lines with no piece from `bits`
+# IS_WIN[bits]     = True if `bits` covers a complete winning line
+OPEN_LINES = [sum(1 for mask in WIN_MASKS if not bits & mask) for bits in range(FULL_BOARD + 1)]
+IS_WIN = [any(bits & mask == mask for mask in WIN_MASKS) for bits in range(FULL_BOARD + 1)]
+
+
+def board_to_bitboards(board):
+    """Convert a 3x3 list-of-lists board into (x_bits, o_bits)"""
+    x_bits = 0
+    o_bits = 0
+    for r in range(3):
+        for c in range(3):
+            if board[r][c] == 'X':
+                x_bits |= cell_bit(r, c)
+            elif board[r][c] == 'O':
+                o_bits |= cell_bit(r, c)
+    return x_bits, o_bits
+
+
+def bitboards_to_board(x_bits, o_bits):
+    """Convert (x_bits, o_bits) back into a 3x3 list-of-lists board"""
+    board = []
+    for r in range(3):
+        row = []
+        for c in range(3):
+            bit = cell_bit(r, c)
+            if x_bits & bit:
+                row.append('X')
+            elif o_bits & bit:
+                row.append('O')
+            else:
+                row.append(EMPTY)
+        board.append(row)
+    return board
+
+
+def evaluate_bitboards(player_bits, opponent_bits):
+    """e(p) for the player owning `player_bits` (no printing)"""
+    # A line is open for the player if it holds no opponent piece, and vice versa
+    return OPEN_LINES[opponent_bits] - OPEN_LINES[player_bits]
+
+
+def is_winner(bits):
+    """Check whether a player's bitmask contains a complete line"""
+    return IS_WIN[bits]
+
+
+def is_full(x_bits, o_bits):
+    return (x_bits | o_bits) == FULL_BOARD
+
+
+def evaluate_board(board, player):
+    """Print-free e(p) for a list-of-lists board"""
+    x_bits, o_bits = board_to_bitboards(board)
+    if player == 'X':
+        return evaluate_bitboards(x_bits, o_bits)
+    return evaluate_bitboards(o_bits, x_bits)
+
+
+def check_winner(board):
+    """Return 'X' or 'O' if that player has a complete line, otherwise None"""
+    x_bits, o_bits = board_to_bitboards(board)
+    if IS_WIN[x_bits]:
+        return 'X'
+    if IS_WIN[o_bits]:
+        return 'O'
+    return None
+
+
+def calculate_heuristic(board, player, verbose=True):
     """
     Calculates e(p) = (Lines open for player) - (Lines open for opponent)
     """
     # Determine who the opponent is
     opponent = 'O' if player == 'X' else 'X'
     
-    # 1. Identify all 8 possible winning lines (3 rows, 3 cols, 2 diagonals)
-    winning_lines = []
-    
-    # Rows
-    for row in board:
-        winning_lines.append(row)
-        
-    # Columns
-    for col in range(3):
-        current_col = [board[row][col] for row in range(3)]
-        winning_lines.append(current_col)
-        
-    # Diagonals
-    diag1 = [board[i][i] for i in range(3)]       # Top-left to bottom-right
-    diag2 = [board[i][2-i] for i in range(3)]     # Top-right to bottom-left
-    winning_lines.append(diag1)
-    winning_lines.append(diag2)
+    # 1. Pack the board into one bitmask per player
+    x_bits, o_bits = board_to_bitboards(board)
+    if player == 'X':
+        player_bits, opponent_bits = x_bits, o_bits
+    else:
+        player_bits, opponent_bits = o_bits, x_bits
     
-    # 2. Count open lines
-    player_open_count = 0
-    opponent_open_count = 0
-    
-    for line in winning_lines:
-        # Check if line is open for Player (contains NO Opponent pieces)
-        if opponent not in line:
-            player_open_count += 1
-            
-        # Check if line is open for Opponent (contains NO Player pieces)
-        if player not in line:
-            opponent_open_count += 1
-            
-    # 3. Calculate Heuristic
-    heuristic_value = player_open_count - opponent_open_count
+    # 2. Score with the same evaluator the search uses
+    heuristic_value = evaluate_bitboards(player_bits, opponent_bits)
     
     # --- Print details for demonstration ---
-    print(f"Player ({player}) open lines: {player_open_count}")
-    print(f"Opponent ({opponent}) open lines: {opponent_open_count}")
+    if verbose:
+        print(f"Player ({player}) open lines: {OPEN_LINES[opponent_bits]}")
+        print(f"Opponent ({opponent}) open lines: {OPEN_LINES[player_bits]}")
     
     return heuristic_value
 
+# ==========================================
+# Minimax Search with Alpha-Beta Pruning
+# ==========================================
+
+# The 8 symmetries of the square (4 rotations x optional reflection) as cell maps
+SYMMETRIES = [
+    lambda r, c: (r, c),
+    lambda r, c: (c, 2 - r),
+    lambda r, c: (2 - r, 2 - c),
+    lambda r, c: (2 - c, r),
+    lambda r, c: (r, 2 - c),
+    lambda r, c: (2 - r, c),
+    lambda r, c: (c, r),
+    lambda r, c: (2 - c, 2 - r),
+]
+
+
+def _symmetry_table(transform):
+    """512-entry table mapping a bitmask to its image under `transform`"""
+    cell_map = []
+    for index in range(9):
+        r, c = transform(index // 3, index % 3)
+        cell_map.append(cell_bit(r, c))
+    table = []
+    for bits in range(FULL_BOARD + 1):
+        image = 0
+        for index in range(9):
+            if bits >> index & 1:
+                image |= cell_map[index]
+        table.append(image)
+    return table
+
+
+SYMMETRY_TABLES = [_symmetry_table(t) for t in SYMMETRIES]
+POPCOUNT = [bin(bits).count('1') for bits in range(FULL_BOARD + 1)]
+
+
+def canonical_key(player_bits, opponent_bits):
+    """Smallest packed encoding of the position over all 8 symmetries"""
+    return min((table[player_bits] << 9) | table[opponent_bits] for table in SYMMETRY_TABLES)
+
+
+def ordered_moves(player_bits, opponent_bits):
+    """Empty cells (as bits) ordered by the e(p) of the resulting position, best first"""
+    empty = FULL_BOARD & ~(player_bits | opponent_bits)
+    moves = []
+    for index in range(9):
+        bit = 1 << index
+        if empty & bit:
+            moves.append((evaluate_bitboards(player_bits | bit, opponent_bits), bit))
+    moves.sort(key=lambda item: -item[0])
+    return [bit for _, bit in moves]
+
+
+# Transposition table bound flags
+EXACT, LOWER, UPPER = 0, 1, 2
+
+
+class MinimaxAI:
+    """Negamax search with alpha-beta pruning and a symmetry-aware transposition table
+
+    Scores are from the side to move: a win is worth 1 + (empty cells left),
+    so faster wins and slower losses are preferred; a draw is 0.
+    """
+
+    def __init__(self):
+        self.table = {}
+        self.nodes = 0
+
+    def clear(self):
+        """Forget all cached positions"""
+        self.table = {}
+
+    def negamax(self, player_bits, opponent_bits, alpha, beta):
+        """Value of the position for the side to move (`player_bits`)"""
+        self.nodes += 1
+        empty_count = 9 - POPCOUNT[player_bits | opponent_bits]
+        if IS_WIN[opponent_bits]:
+            return -(1 + empty_count)
+        if empty_count == 0:
+            return 0
+
+        key = canonical_key(player_bits, opponent_bits)
+        entry = self.table.get(key)
+        if entry is not None:
+            value, flag = entry
+            if flag == EXACT:
+                return value
+            if flag == LOWER:
+                alpha = max(alpha, value)
+            else:
+                beta = min(beta, value)
+            if alpha >= beta:
+                return value
+
+        alpha_orig = alpha
+        best = -10
+        for bit in ordered_moves(player_bits, opponent_bits):
+            score = -self.negamax(opponent_bits, player_bits | bit, -beta, -alpha)
+            if score > best:
+                best = score
+            if best > alpha:
+                alpha = best
+            if alpha >= beta:
+                break
+
+        if best <= alpha_orig:
+            flag = UPPER
+        elif best >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self.table[key] = (best, flag)
+        return best
+
+    def search(self, board, player):
+        """Find the best move for `player`
+
+        Returns ((row, col), value); the move is None if the game is already over.
+        `self.nodes` holds the number of positions visited by this search.
+        """
+        x_bits, o_bits = board_to_bitboards(board)
+        if player == 'X':
+            player_bits, opponent_bits = x_bits, o_bits
+        else:
+            player_bits, opponent_bits = o_bits, x_bits
+
+        self.nodes = 1
+        if IS_WIN[x_bits] or IS_WIN[o_bits] or is_full(x_bits, o_bits):
+            return None, self.negamax(player_bits, opponent_bits, -10, 10)
+
+        best_move = None
+        alpha, beta = -10, 10
+        for bit in ordered_moves(player_bits, opponent_bits):
+            score = -self.negamax(opponent_bits, player_bits | bit, -beta, -alpha)
+            if best_move is None or score > alpha:
+                alpha = score
+                index = bit.bit_length() - 1
+                best_move = (index // 3, index % 3)
+        return best_move, alpha
+
+    def best_move(self, board, player):
+        """Best (row, col) for `player`, or None if the game is over"""
+        return self.search(board, player)[0]
+
+
+# ==========================================
+# Precomputed Solved-Game Table
+# ==========================================
+
+# Binary layout: a header followed by one 2-byte record per (board, side to move).
+# The board is indexed in base 3 (cell r*3 + c is digit r*3 + c: 0 empty, 1 X, 2 O)
+# and the side to move picks the even (X) or odd (O) record of that board.
+TABLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tic_tac_toe.table")
+TABLE_MAGIC = b"TTTS"
+TABLE_VERSION = 1
+TABLE_HEADER = struct.Struct("<4sHI")
+TABLE_RECORDS = 2 * 3 ** 9
+NO_MOVE = 255
+
+# TERNARY[bits] = base-3 value of a bitmask with every set cell as digit 1
+TERNARY = [sum(3 ** i for i in range(9) if bits >> i & 1) for bits in range(FULL_BOARD + 1)]
+
+
+def table_index(x_bits, o_bits, player):
+    """Record number of a position in the solved table"""
+    return 2 * (TERNARY[x_bits] + 2 * TERNARY[o_bits]) + (0 if player == 'X' else 1)
+
+
+def solve_position(player_bits, opponent_bits, memo):
+    """Exact negamax (value, best move index) using MinimaxAI's scoring"""
+    key = (player_bits, opponent_bits)
+    if key in memo:
+        return memo[key]
+    empty_count = 9 - POPCOUNT[player_bits | opponent_bits]
+    if IS_WIN[opponent_bits]:
+        result = (-(1 + empty_count), NO_MOVE)
+    elif empty_count == 0:
+        result = (0, NO_MOVE)
+    else:
+        result = None
+        for bit in ordered_moves(player_bits, opponent_bits):
+            score = -solve_position(opponent_bits, player_bits | bit, memo)[0]
+            if result is None or score > result[0]:
+                result = (score, bit.bit_length() - 1)
+    memo[key] = result
+    return result
+
+
+def build_solved_table(path=TABLE_PATH):
+    """Solve every board for both sides to move and write the binary table"""
+    records = bytearray([0, NO_MOVE]) * TABLE_RECORDS
+    memo = {}
+    for x_bits in range(FULL_BOARD + 1):
+        for o_bits in range(FULL_BOARD + 1):
+            if x_bits & o_bits:
+                continue
+            for player in ('X', 'O'):
+                if player == 'X':
+                    value, move = solve_position(x_bits, o_bits, memo)
+                else:
+                    value, move = solve_position(o_bits, x_bits, memo)
+                # A position that is already over has no move to play
+                if IS_WIN[x_bits] or IS_WIN[o_bits]:
+                    move = NO_MOVE
+                offset = 2 * table_index(x_bits, o_bits, player)
+                records[offset] = value & 0xFF
+                records[offset + 1] = move
+    with open(path, "wb") as f:
+        f.write(TABLE_HEADER.pack(TABLE_MAGIC, TABLE_VERSION, TABLE_RECORDS))
+        f.write(records)
+    return len(memo)
+
+
+class SolvedTable:
+    """Memory-mapped view of a table written by build_solved_table"""
+
+    def __init__(self, path=TABLE_PATH):
+        with open(path, "rb") as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self.data) != TABLE_HEADER.size + 2 * TABLE_RECORDS:
+            self.close()
+            raise ValueError(f"{path}: unexpected table size")
+        magic, version, count = TABLE_HEADER.unpack_from(self.data, 0)
+        if magic != TABLE_MAGIC or version != TABLE_VERSION or count != TABLE_RECORDS:
+            self.close()
+            raise ValueError(f"{path}: table version {version} does not match {TABLE_VERSION}")
+
+    def close(self):
+        self.data.close()
+
+    def lookup(self, board, player):
+        """Return ((row, col), value) for `player`, exactly like MinimaxAI.search"""
+        x_bits, o_bits = board_to_bitboards(board)
+        offset = TABLE_HEADER.size + 2 * table_index(x_bits, o_bits, player)
+        value = self.data[offset]
+        move = self.data[offset + 1]
+        if value > 127:
+            value -= 256
+        if move == NO_MOVE:
+            return None, value
+        return (move // 3, move % 3), value
+
+
+class TablePlayer:
+    """Plays from the solved table, falling back to live search if it is unavailable"""
+
+    def __init__(self, path=TABLE_PATH):
+        self.table = None
+        self.search_ai = None
+        try:
+            self.table = SolvedTable(path)
+        except (OSError, ValueError):
+            self.search_ai = MinimaxAI()
+
+    def search(self, board, player):
+        if self.table is not None:
+            return self.table.lookup(board, player)
+        return self.search_ai.search(board, player)
+
+    def best_move(self, board, player):
+        return self.search(board, player)[0]
+
+
+# ==========================================
+# Generalized m,n,k Board (3x3 up to Gomoku)
+# ==========================================
+
+# Cell / player codes for MNKBoard
+NOBODY, PLAYER_X, PLAYER_O = 0, 1, 2
+PIECES = {'X': PLAYER_X, 'O': PLAYER_O}
+WIN_SCORE = 1000000
+
+
+class MNKBoard:
+    """rows x cols board where k in a row wins, with incrementally maintained e(p)
+
+    Every k-cell window (horizontal, vertical and both diagonals) is a candidate
+    winning line. For each window we keep how many stones each player has in it,
+    and for each player how many windows are still open (no opponent stone).
+    make_move/unmake_move only touch the windows through the changed cell.
+    """
+
+    def __init__(self, rows=3, cols=3, k=3):
+        self.rows = rows
+        self.cols = cols
+        self.k = k
+        self.cells = [NOBODY] * (rows * cols)
+        self.windows = []
+        for r in range(rows):
+            for c in range(cols):
+                for dr, dc in ((0, 1), (1, 0), (1, 1), (1, -1)):
+                    end_r = r + dr * (k - 1)
+                    end_c = c + dc * (k - 1)
+                    if 0 <= end_r < rows and 0 <= end_c < cols:
+                        self.windows.append(tuple((r + dr * i) * cols + c + dc * i for i in range(k)))
+        self.cell_windows = [[] for _ in self.cells]
+        for w, window in enumerate(self.windows):
+            for cell in window:
+                self.cell_windows[cell].append(w)
+        # counts[player][w] = stones of `player` in window w
+        self.counts = [None, [0] * len(self.windows), [0] * len(self.windows)]
+        # open_lines[player] = windows holding no opponent stone
+        self.open_lines = [0, len(self.windows), len(self.windows)]
+        self.to_move = PLAYER_X
+        self.winner = NOBODY
+        self.stones = 0
+        self.history = []
+
+    @classmethod
+    def from_rows(cls, board, k=None, to_move='X'):
+        """Build from a list-of-lists board in calculate_heuristic's format"""
+        rows, cols = len(board), len(board[0])
+        mnk = cls(rows, cols, k or min(rows, cols))
+        for r in range(rows):
+            for c in range(cols):
+                if board[r][c] in PIECES:
+                    mnk.to_move = PIECES[board[r][c]]
+                    mnk.make_move(r * cols + c)
+        mnk.to_move = PIECES[to_move]
+        mnk.history = []
+        return mnk
+
+    def to_rows(self):
+        symbols = [EMPTY, 'X', 'O']
+        return [[symbols[self.cells[r * self.cols + c]] for c in range(self.cols)]
+                for r in range(self.rows)]
+
+    def make_move(self, cell):
+        """Place a stone for the side to move"""
+        player = self.to_move
+        opponent = 3 - player
+        own = self.counts[player]
+        self.history.append((cell, self.winner))
+        for w in self.cell_windows[cell]:
+            if own[w] == 0:
+                # Window is no longer open for the opponent
+                self.open_lines[opponent] -= 1
+            own[w] += 1
+            if own[w] == self.k:
+                self.winner = player
+        self.cells[cell] = player
+        self.stones += 1
+        self.to_move = opponent
+
+    def unmake_move(self):
+        """Take back the last move"""
+        cell, self.winner = self.history.pop()
+        player = self.cells[cell]
+        opponent = 3 - player
+        own = self.counts[player]
+        for w in self.cell_windows[cell]:
+            own[w] -= 1
+            if own[w] == 0:
+                self.open_lines[opponent] += 1
+        self.cells[cell] = NOBODY
+        self.stones -= 1
+        self.to_move = player
+
+    def evaluate(self, player):
+        """e(p) = (open lines for player) - (open lines for opponent)"""
+        return self.open_lines[player] - self.open_lines[3 - player]
+
+    def is_full(self):
+        return self.stones == len(self.cells)
+
+    def candidate_moves(self, radius=2):
+        """Empty cells within `radius` of a stone (the centre on an empty board)"""
+        occupied = [cell for cell, value in enumerate(self.cells) if value != NOBODY]
+        if not occupied:
+            return [(self.rows // 2) * self.cols + self.cols // 2]
+        if self.rows * self.cols <= 25:
+            return [cell for cell, value in enumerate(self.cells) if value == NOBODY]
+        near = set()
+        for cell in occupied:
+            r, c = divmod(cell, self.cols)
+            for nr in range(max(0, r - radius), min(self.rows, r + radius + 1)):
+                for nc in range(max(0, c - radius), min(self.cols, c + radius + 1)):
+                    if self.cells[nr * self.cols + nc] == NOBODY:
+                        near.add(nr * self.cols + nc)
+        return list(near)
+
+    def move_priority(self, cell):
+        """Ordering score: own threats extended plus opponent threats blocked"""
+        own = self.counts[self.to_move]
+        other = self.counts[3 - self.to_move]
+        score = 0
+        for w in self.cell_windows[cell]:
+            if other[w] == 0:
+                score += (own[w] + 1) ** 2
+            if own[w] == 0:
+                score += other[w] ** 2
+        return score
+
+
+class SearchTimeout(Exception):
+    """Raised inside MNKSearch when the time budget runs out"""
+
+
+class MNKSearch:
+    """Iterative-deepening negamax with alpha-beta on an MNKBoard
+
+    Leaves are scored with the board's e(p). Each iteration starts from the
+    previous principal move, and the last fully searched depth is returned
+    when the wall-clock budget expires.
+    """
+
+    def __init__(self, radius=2):
+        self.radius = radius
+        self.nodes = 0
+        self.depth_reached = 0
+        self.deadline = None
+
+    def ordered_moves(self, board):
+        moves = board.candidate_moves(self.radius)
+        moves.sort(key=board.move_priority, reverse=True)
+        return moves
+
+    def negamax(self, board, depth, alpha, beta, ply):
+        self.nodes += 1
+        if self.nodes & 1023 == 0 and self.deadline is not None and time.perf_counter() > self.deadline:
+            raise SearchTimeout()
+        if board.winner:
+            # The player who just moved completed a line
+            return -(WIN_SCORE - ply)
+        if board.is_full():
+            return 0
+        if depth == 0:
+            return board.evaluate(board.to_move)
+
+        best = -WIN_SCORE - 1
+        for cell in self.ordered_moves(board):
+            board.make_move(cell)
+            try:
+                score = -self.negamax(board, depth - 1, -beta, -alpha, ply + 1)
+            finally:
+                board.unmake_move()
+            if score > best:
+                best = score
+            if best > alpha:
+                alpha = best
+            if alpha >= beta:
+                break
+        return best
+
+    def search(self, board, time_budget=1.0, max_depth=None):
+        """Best (row, col) for the side to move within `time_budget` seconds
+
+        Returns ((row, col), value); `self.depth_reached` and `self.nodes`
+        describe the search. The move is None if the game is over.
+        """
+        self.nodes = 0
+        self.depth_reached = 0
+        self.deadline = None if time_budget is None else time.perf_counter() + time_budget
+        if board.winner or board.is_full():
+            return None, 0
+
+        empties = len(board.cells) - board.stones
+        max_depth = empties if max_depth is None else min(max_depth, empties)
+        moves = self.ordered_moves(board)
+        best_cell, best_value = moves[0], board.evaluate(board.to_move)
+
+        for depth in range(1, max_depth + 1):
+            alpha, beta = -WIN_SCORE - 1, WIN_SCORE + 1
+            iteration_best = None
+            try:
+                for cell in moves:
+                    board.make_move(cell)
+                    try:
+                        score = -self.negamax(board, depth - 1, -beta, -alpha, 1)
+                    finally:
+                        board.unmake_move()
+                    if iteration_best is None or score > alpha:
+                        alpha = score
+                        iteration_best = cell
+            except SearchTimeout:
+                break
+            best_cell, best_value = iteration_best, alpha
+            self.depth_reached = depth
+            # Search the principal move first in the next iteration
+            moves.remove(best_cell)
+            moves.insert(0, best_cell)
+            if abs(best_value) >= WIN_SCORE - max_depth:
+                break
+
+        return divmod(best_cell, board.cols), best_value
+
+
+# ==========================================
+# Monte Carlo Tree Search (large boards)
+# ==========================================
+
+class MCTSNode:
+    """Search tree node; `wins` are scored for the player who moved into it"""
+
+    __slots__ = ("move", "parent", "children", "untried", "visits", "wins")
+
+    def __init__(self, move, parent, untried):
+        self.move = move
+        self.parent = parent
+        self.children = []
+        self.untried = untried
+        self.visits = 0
+        self.wins = 0.0
+
+    def select_child(self, exploration):
+        """UCT: exploit the win rate, explore rarely visited children"""
+        log_visits = math.log(self.visits)
+        return max(self.children, key=lambda child: child.wins / child.visits +
+                   exploration * math.sqrt(log_visits / child.visits))
+
+
+def rollout(board, rng, sample_size, limit):
+    """Play out the position with e(p)-guided moves; returns the winner code
+
+    Each move is the best of `sample_size` random empty cells by
+    MNKBoard.move_priority. After `limit` moves (if set) the game is scored by
+    the sign of e(p) instead of being played to the end.
+    """
+    empties = [cell for cell, value in enumerate(board.cells) if value == NOBODY]
+    made = 0
+    while not board.winner and empties and (limit is None or made < limit):
+        best_index = None
+        best_priority = -1
+        for _ in range(min(sample_size, len(empties))):
+            index = rng.randrange(len(empties))
+            priority = board.move_priority(empties[index])
+            if priority > best_priority:
+                best_index, best_priority = index, priority
+        cell = empties[best_index]
+        empties[best_index] = empties[-1]
+        empties.pop()
+        board.make_move(cell)
+        made += 1
+
+    winner = board.winner
+    if not winner and empties:
+        score = board.evaluate(PLAYER_X)
+        winner = PLAYER_X if score > 0 else PLAYER_O if score < 0 else NOBODY
+    for _ in range(made):
+        board.unmake_move()
+    return winner
+
+
+def run_mcts(board, playouts=None, time_budget=None, exploration=1.4, radius=2,
+             sample_size=4, rollout_limit=None, seed=None):
+    """Grow one UCT tree from `board`; returns ({root move: (visits, wins)}, playouts)
+
+    A time budget always allows at least one playout.
+    """
+    rng = random.Random(seed)
+    deadline = None if time_budget is None else time.perf_counter() + time_budget
+    root = MCTSNode(None, None, board.candidate_moves(radius))
+    done = 0
+    while (playouts is None or done < playouts) and (deadline is None or done == 0
+                                                       or time.perf_counter() < deadline):
+        node = root
+        depth = 0
+        # 1. Selection
+        while not node.untried and node.children:
+            node = node.select_child(exploration)
+            board.make_move(node.move)
+            depth += 1
+        # 2. Expansion
+        if node.untried and not board.winner:
+            cell = node.untried.pop(rng.randrange(len(node.untried)))
+            board.make_move(cell)
+            depth += 1
+            untried = [] if board.winner or board.is_full() else board.candidate_moves(radius)
+            child = MCTSNode(cell, node, untried)
+            node.children.append(child)
+            node = child
+        # 3. Simulation
+        winner = rollout(board, rng, sample_size, rollout_limit)
+        # 4. Backpropagation
+        for _ in range(depth):
+            board.unmake_move()
+        # The node at odd depth was entered by the side to move at the root
+        mover = board.to_move if depth % 2 else 3 - board.to_move
+        while node is not None:
+            node.visits += 1
+            if winner == mover:
+                node.wins += 1.0
+            elif winner == NOBODY:
+                node.wins += 0.5
+            mover = 3 - mover
+            node = node.parent
+        done += 1
+    return {child.move: (child.visits, child.wins) for child in root.children}, done
+
+
+def _mcts_worker(args):
+    board, options = args
+    return run_mcts(board, **options)
+
+
+class MCTSPlayer:
+    """UCT player for MNKBoard with root-parallel playouts on a process pool
+
+    Give a fixed `playouts` count, a `time_budget` in seconds, or both. With
+    `workers` > 1 each process grows its own tree and the root statistics are
+    summed. After `search`, `playouts`, `elapsed` and `playouts_per_second`
+    describe the run.
+    """
+
+    def __init__(self, playouts=None, time_budget=1.0, workers=1, exploration=1.4,
+                 radius=2, sample_size=4, rollout_limit=None, seed=None):
+        if playouts is None and time_budget is None:
+            raise ValueError("MCTSPlayer needs a playout count or a time budget")
+        self.max_playouts = playouts
+        self.time_budget = time_budget
+        self.workers = workers
+        self.exploration = exploration
+        self.radius = radius
+        self.sample_size = sample_size
+        self.rollout_limit = rollout_limit
+        self.seed = seed
+        self.playouts = 0
+        self.elapsed = 0.0
+        self.playouts_per_second = 0.0
+
+    def search(self, board):
+        """Best (row, col) for the side to move, or None if the game is over"""
+        if board.winner or board.is_full():
+            return None
+        start = time.perf_counter()
+        base_seed = self.seed if self.seed is not None else random.randrange(1 << 30)
+        per_worker = None if self.max_playouts is None else -(-self.max_playouts // self.workers)
+        jobs = []
+        for worker in range(self.workers):
+            options = dict(playouts=per_worker, time_budget=self.time_budget,
+                           exploration=self.exploration, radius=self.radius,
+                           sample_size=self.sample_size, rollout_limit=self.rollout_limit,
+                           seed=base_seed + worker)
+            jobs.append((board, options))
+
+        if self.workers == 1:
+            results = [_mcts_worker(jobs[0])]
+        else:
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                results = list(pool.map(_mcts_worker, jobs))
+
+        totals = {}
+        self.playouts = 0
+        for stats, done in results:
+            self.playouts += done
+            for move, (visits, wins) in stats.items():
+                old_visits, old_wins = totals.get(move, (0, 0.0))
+                totals[move] = (old_visits + visits, old_wins + wins)
+        self.elapsed = time.perf_counter() - start
+        self.playouts_per_second = self.playouts / self.elapsed if self.elapsed > 0 else 0.0
+
+        if totals:
+            best = max(totals, key=lambda move: totals[move][0])
+        else:  # No playout finished (e.g. playouts=0): fall back to move ordering
+            best = max(board.candidate_moves(self.radius), key=board.move_priority)
+        return divmod(best, board.cols)
+
+
+# ==========================================
+# Vectorized Batch Evaluation (NumPy)
+# ==========================================
+
+def line_indices(rows, cols, k):
+    """(windows, k) array of flat cell indices for every k-in-a-row line"""
+    return np.array(MNKBoard(rows, cols, k).windows, dtype=np.intp)
+
+
+def batch_evaluate(boards, player='X', k=None, chunk_size=65536):
+    """Score N boards at once
+
+    `boards` is an (N, rows, cols) int8 array using MNKBoard's codes
+    (0 empty, 1 X, 2 O). Returns (values, winners, terminal):
+    values[i]   - e(p) of board i for `player`, as calculate_heuristic computes it
+    winners[i]  - 1 if X has a line, else 2 if O has a line, else 0 (like check_winner)
+    terminal[i] - True if board i has a winner or no empty cell
+    """
+    if np is None:
+        raise ImportError("batch_evaluate requires numpy")
+    boards = np.asarray(boards, dtype=np.int8)
+    n, rows, cols = boards.shape
+    lines = line_indices(rows, cols, k or min(rows, cols))
+    flat = boards.reshape(n, rows * cols)
+    sign = 1 if player == 'X' else -1
+
+    values = np.empty(n, dtype=np.int32)
+    winners = np.empty(n, dtype=np.int8)
+    # Chunking bounds the (chunk, windows, k) temporaries
+    for start in range(0, n, chunk_size):
+        cells = flat[start:start + chunk_size][:, lines]
+        has_x = (cells == PLAYER_X)
+        has_o = (cells == PLAYER_O)
+        x_open = np.count_nonzero(~has_o.any(axis=2), axis=1)
+        o_open = np.count_nonzero(~has_x.any(axis=2), axis=1)
+        values[start:start + chunk_size] = sign * (x_open - o_open)
+        x_wins = has_x.all(axis=2).any(axis=1)
+        o_wins = has_o.all(axis=2).any(axis=1)
+        winners[start:start + chunk_size] = np.where(x_wins, PLAYER_X, np.where(o_wins, PLAYER_O, NOBODY))
+
+    terminal = (winners != NOBODY) | ~(flat == NOBODY).any(axis=1)
+    return values, winners, terminal
+
+
 # ==========================================
 # Main Execution / Test Case
 # ==========================================
@@ -57,21 +843,35 @@ def calculate_heuristic(board, player):
 # ---+---+---
 #  X | - | - 
 
-current_board = [
-    ['X', '-', '-'],
-    ['-', 'O', '-'],
-    ['X', '-', '-']
-]
+if __name__ == "__main__":
+    if "--build-table" in sys.argv:
+        solved = build_solved_table()
+        print(f"Solved {solved} positions -> {TABLE_PATH}")
+        sys.exit(0)
+
+    current_board = [
+        ['X', '-', '-'],
+        ['-', 'O', '-'],
+        ['X', '-', '-']
+    ]
+
+    # We want to calculate heuristic for player 'X'
+    current_player = 'X'
+
+    print("Current Board State:")
+    for row in current_board:
+        print(row)
+    print("-" * 20)
 
-# We want to calculate heuristic for player 'X'
-current_player = 'X'
+    h_val = calculate_heuristic(current_board, current_player)
 
-print("Current Board State:")
-for row in current_board:
-    print(row)
-print("-" * 20)
+    print("-" * 20)
+    print(f"Heuristic Value e(p) = {h_val}")
 
-h_val = calculate_heuristic(current_board, current_player)
+    ai = MinimaxAI()
+    move, value = ai.search(current_board, current_player)
+    print(f"Best move for {current_player}: {move} (value {value}, {ai.nodes} nodes searched)")
 
-print("-" * 20)
-print(f"Heuristic Value e(p) = {h_val}")
\ No newline at end of file
+    player = TablePlayer()
+    source = "solved table" if player.table is not None else "live search"
+    print(f"Best move from {source}: {player.best_move(current_board, current_player)}")
\ No newline at end of file
@@ -0,0 +1,51 @@
+import pytest
+
+import Tic_Tac_Toe as ttt
+
+np = pytest.importorskip("numpy")
+
+CODES = {ttt.EMPTY: ttt.NOBODY, 'X': ttt.PLAYER_X, 'O': ttt.PLAYER_O}
+
+
+def reachable_boards():
+    """Every board reachable from the empty board, X first, play stopping at a win"""
+    start = tuple([ttt.EMPTY] * 9)
+    seen = {start}
+    stack = [(start, 'X')]
+    while stack:
+        cells, player = stack.pop()
+        board = [list(cells[row * 3:row * 3 + 3]) for row in range(3)]
+        if ttt.check_winner(board):
+            continue
+        for i, cell in enumerate(cells):
+            if cell == ttt.EMPTY:
+                child = cells[:i] + (player,) + cells[i + 1:]
+                if child not in seen:
+                    seen.add(child)
+                    stack.append((child, 'O' if player == 'X' else 'X'))
+    return [[list(cells[row * 3:row * 3 + 3]) for row in range(3)] for cells in seen]
+
+
+BOARDS = reachable_boards()
+
+
+def test_reachable_boards_cover_every_outcome():
+    assert len(BOARDS) == 5478
+    winners = [ttt.check_winner(board) for board in BOARDS]
+    full = [all(cell != ttt.EMPTY for row in board for cell in row) for board in BOARDS]
+    assert 'X' in winners and 'O' in winners
+    assert any(winner is None and done for winner, done in zip(winners, full))
+    assert any(winner is None and not done for winner, done in zip(winners, full))
+
+
+@pytest.mark.parametrize("player", ['X', 'O'])
+def test_batch_evaluate_matches_scalar(player):
+    array = np.array([[[CODES[cell] for cell in row] for row in board] for board in BOARDS], dtype=np.int8)
+    # A small chunk size also exercises the chunk boundaries
+    values, winners, terminal = ttt.batch_evaluate(array, player, chunk_size=1000)
+    for i, board in enumerate(BOARDS):
+        winner = ttt.check_winner(board)
+        full = all(cell != ttt.EMPTY for row in board for cell in row)
+        assert values[i] == ttt.calculate_heuristic(board, player, verbose=False)
+        assert winners[i] == CODES[winner or ttt.EMPTY]
+        assert terminal[i] == (winner is not None or full)
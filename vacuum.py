@@ -1,6 +1,20 @@
-import tkinter as tk
+import argparse
+import heapq
 import random
+import sys
 import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+try:
+    import tkinter as tk
+except ImportError:  # Simulations run headless, see --headless
+    tk = None
+
+# Row/column offsets for each heading: Up, Right, Down, Left
+DIRECTIONS = ((-1, 0), (0, 1), (1, 0), (0, -1))
 
 # ====================================
 # VACUUM CLEANER AGENT
@@ -21,8 +35,7 @@ class VacuumAgent:
     
     def move_forward(self, grid_size):
         """Move in current direction"""
-        directions = [(-1, 0), (0, 1), (1, 0), (0, -1)]  # Up, Right, Down, Left
-        dr, dc = directions[self.direction]
+        dr, dc = DIRECTIONS[self.direction]
         new_row = self.row + dr
         new_col = self.col + dc
         return new_row, new_col
@@ -39,7 +52,11 @@ class VacuumAgent:
 
 
 class Room:
-    """The room environment with dirt and obstacles"""
+    """The room environment with dirt and obstacles
+
+    The grid is a (rows, cols) uint8 NumPy array of cell types, so whole-room
+    scans and region updates run vectorized even for 1000x1000 rooms.
+    """
     
     # Cell types
     CLEAN = 0
@@ -50,49 +67,1198 @@ class Room:
     def __init__(self, rows, cols):
         self.rows = rows
         self.cols = cols
-        self.grid = [[self.CLEAN for _ in range(cols)] for _ in range(rows)]
+        self.grid = np.zeros((rows, cols), dtype=np.uint8)
         self.total_dirty = 0
     
     def add_dirt(self, row, col):
-        if self.grid[row][col] == self.CLEAN:
-            self.grid[row][col] = self.DIRTY
+        if self.grid.item(row, col) == self.CLEAN:
+            self.grid[row, col] = self.DIRTY
             self.total_dirty += 1
     
     def add_obstacle(self, row, col):
-        self.grid[row][col] = self.OBSTACLE
+        if self.grid.item(row, col) == self.DIRTY:
+            self.total_dirty -= 1
+        self.grid[row, col] = self.OBSTACLE
     
     def is_valid_move(self, row, col):
         """Check if position is valid and not an obstacle"""
         if 0 <= row < self.rows and 0 <= col < self.cols:
-            return self.grid[row][col] != self.OBSTACLE
+            return self.grid.item(row, col) != self.OBSTACLE
         return False
     
     def is_dirty(self, row, col):
-        return self.grid[row][col] == self.DIRTY
+        return self.grid.item(row, col) == self.DIRTY
     
     def clean_cell(self, row, col):
-        if self.grid[row][col] == self.DIRTY:
-            self.grid[row][col] = self.CLEAN
+        if self.grid.item(row, col) == self.DIRTY:
+            self.grid[row, col] = self.CLEAN
             self.total_dirty -= 1
             return True
         return False
     
     def is_obstacle(self, row, col):
         if 0 <= row < self.rows and 0 <= col < self.cols:
-            return self.grid[row][col] == self.OBSTACLE
+            return self.grid.item(row, col) == self.OBSTACLE
         return True  # Out of bounds is like obstacle
     
-    def randomize(self, dirt_probability=0.4, obstacle_probability=0.1, agent_pos=(0, 0)):
-        """Randomly place dirt and obstacles"""
-        for r in range(self.rows):
-            for c in range(self.cols):
-                if (r, c) == agent_pos:
+    def cell(self, row, col):
+        """Cell type at an in-bounds position"""
+        return self.grid.item(row, col)
+    
+    def count_dirty(self):
+        """Number of dirty cells, counted over the whole grid"""
+        return int(np.count_nonzero(self.grid == self.DIRTY))
+    
+    def count_obstacles(self):
+        return int(np.count_nonzero(self.grid == self.OBSTACLE))
+    
+    def fill_region(self, top, left, bottom, right, cell):
+        """Set every cell in rows top..bottom-1, cols left..right-1 to `cell`"""
+        region = self.grid[top:bottom, left:right]
+        self.total_dirty -= int(np.count_nonzero(region == self.DIRTY))
+        region[...] = cell
+        if cell == self.DIRTY:
+            self.total_dirty += region.size
+    
+    def dirt_in_region(self, top, left, bottom, right):
+        return int(np.count_nonzero(self.grid[top:bottom, left:right] == self.DIRTY))
+    
+    def clean_region(self, top, left, bottom, right):
+        """Clean every dirty cell in the region; returns how many were cleaned"""
+        region = self.grid[top:bottom, left:right]
+        dirty = region == self.DIRTY
+        cleaned = int(np.count_nonzero(dirty))
+        region[dirty] = self.CLEAN
+        self.total_dirty -= cleaned
+        return cleaned
+    
+    def randomize(self, dirt_probability=0.4, obstacle_probability=0.1, agent_pos=(0, 0), seed=None):
+        """Randomly place dirt and obstacles
+
+        `seed` may be an int or a numpy Generator; the same seed gives the same
+        room. The agent's cell is left untouched.
+        """
+        rng = np.random.default_rng(seed)
+        rand = rng.random((self.rows, self.cols))
+        if agent_pos is not None:
+            rand[agent_pos] = 1.0
+        obstacles = rand < obstacle_probability
+        dirt = ~obstacles & (rand < obstacle_probability + dirt_probability) & (self.grid == self.CLEAN)
+        self.grid[obstacles] = self.OBSTACLE
+        self.grid[dirt] = self.DIRTY
+        self.total_dirty = self.count_dirty()
+
+
+class RoomChunk:
+    """One CHUNK x CHUNK tile of a SparseRoom: dirt and obstacle bitsets"""
+    
+    __slots__ = ("dirt", "obstacles", "dirty_count", "obstacle_count")
+    
+    def __init__(self, size):
+        self.dirt = bytearray(size * size // 8)
+        self.obstacles = bytearray(size * size // 8)
+        self.dirty_count = 0
+        self.obstacle_count = 0
+
+
+class SparseRoom:
+    """Room backend for huge, mostly empty floors
+
+    Cells live in CHUNK x CHUNK tiles holding one dirt and one obstacle
+    bitset; a tile is allocated the first time dirt or an obstacle is put in
+    it, and untouched tiles read as clean. Has the same cell API as Room
+    (is_valid_move, is_dirty, clean_cell, is_obstacle, cell, total_dirty), so
+    VacuumSimulation runs on it unchanged with RandomWalkPolicy (its default
+    here; the grid-based policies raise TypeError), plus per-chunk dirt
+    queries for planners.
+    """
+    
+    CLEAN = Room.CLEAN
+    DIRTY = Room.DIRTY
+    OBSTACLE = Room.OBSTACLE
+    AGENT = Room.AGENT
+    CHUNK = 64
+    SHIFT = 6  # log2(CHUNK)
+    
+    def __init__(self, rows, cols):
+        self.rows = rows
+        self.cols = cols
+        self.chunks = {}
+        self.total_dirty = 0
+    
+    def locate(self, row, col, create=False):
+        """(chunk or None, byte index, bit mask) for a cell"""
+        key = (row >> self.SHIFT, col >> self.SHIFT)
+        chunk = self.chunks.get(key)
+        if chunk is None and create:
+            chunk = self.chunks[key] = RoomChunk(self.CHUNK)
+        bit = (row & (self.CHUNK - 1)) * self.CHUNK + (col & (self.CHUNK - 1))
+        return chunk, bit >> 3, 1 << (bit & 7)
+    
+    def check_bounds(self, row, col):
+        if not (0 <= row < self.rows and 0 <= col < self.cols):
+            raise IndexError(f"Cell ({row}, {col}) is outside the {self.rows}x{self.cols} room")
+    
+    def add_dirt(self, row, col):
+        self.check_bounds(row, col)
+        chunk, index, mask = self.locate(row, col, create=True)
+        if not (chunk.dirt[index] | chunk.obstacles[index]) & mask:
+            chunk.dirt[index] |= mask
+            chunk.dirty_count += 1
+            self.total_dirty += 1
+    
+    def add_obstacle(self, row, col):
+        self.check_bounds(row, col)
+        chunk, index, mask = self.locate(row, col, create=True)
+        if chunk.obstacles[index] & mask:
+            return
+        if chunk.dirt[index] & mask:
+            chunk.dirt[index] &= ~mask
+            chunk.dirty_count -= 1
+            self.total_dirty -= 1
+        chunk.obstacles[index] |= mask
+        chunk.obstacle_count += 1
+    
+    def is_valid_move(self, row, col):
+        """Check if position is valid and not an obstacle"""
+        if 0 <= row < self.rows and 0 <= col < self.cols:
+            return self.cell(row, col) != self.OBSTACLE
+        return False
+    
+    def is_dirty(self, row, col):
+        chunk, index, mask = self.locate(row, col)
+        return chunk is not None and chunk.dirt[index] & mask != 0
+    
+    def clean_cell(self, row, col):
+        chunk, index, mask = self.locate(row, col)
+        if chunk is not None and chunk.dirt[index] & mask:
+            chunk.dirt[index] &= ~mask
+            chunk.dirty_count -= 1
+            self.total_dirty -= 1
+            return True
+        return False
+    
+    def is_obstacle(self, row, col):
+        if 0 <= row < self.rows and 0 <= col < self.cols:
+            return self.cell(row, col) == self.OBSTACLE
+        return True  # Out of bounds is like obstacle
+    
+    def cell(self, row, col):
+        chunk, index, mask = self.locate(row, col)
+        if chunk is None:
+            return self.CLEAN
+        if chunk.obstacles[index] & mask:
+            return self.OBSTACLE
+        return self.DIRTY if chunk.dirt[index] & mask else self.CLEAN
+    
+    def count_dirty(self):
+        return sum(chunk.dirty_count for chunk in self.chunks.values())
+    
+    def count_obstacles(self):
+        return sum(chunk.obstacle_count for chunk in self.chunks.values())
+    
+    def chunk_has_dirt(self, chunk_row, chunk_col):
+        chunk = self.chunks.get((chunk_row, chunk_col))
+        return chunk is not None and chunk.dirty_count > 0
+    
+    def dirty_chunks(self):
+        """(chunk_row, chunk_col) of every chunk holding dirt"""
+        return [key for key, chunk in self.chunks.items() if chunk.dirty_count]
+    
+    def chunk_grid(self, chunk_row, chunk_col):
+        """Dense CHUNK x CHUNK uint8 cell types of one chunk, for local planning"""
+        grid = np.zeros((self.CHUNK, self.CHUNK), dtype=np.uint8)
+        chunk = self.chunks.get((chunk_row, chunk_col))
+        if chunk is not None:
+            shape = (self.CHUNK, self.CHUNK)
+            dirt = np.unpackbits(np.frombuffer(chunk.dirt, dtype=np.uint8), bitorder="little").reshape(shape)
+            obstacles = np.unpackbits(np.frombuffer(chunk.obstacles, dtype=np.uint8), bitorder="little").reshape(shape)
+            grid[dirt == 1] = self.DIRTY
+            grid[obstacles == 1] = self.OBSTACLE
+        return grid
+    
+    def randomize(self, dirt_probability=1e-6, obstacle_probability=1e-6, agent_pos=(0, 0), seed=None,
+                  dirt_count=None, obstacle_count=None):
+        """Scatter dirt and obstacles over the floor without visiting every cell
+
+        `dirt_count` / `obstacle_count` give how many cells to place; when
+        None the count is drawn from a binomial on the probability. Rows and
+        columns are sampled directly, so the cost is in the cells placed
+        (duplicates and the agent's cell are skipped). Keep counts small: a
+        chunk is allocated for each cell placed in an empty one.
+        """
+        rng = np.random.default_rng(seed)
+        cells = self.rows * self.cols
+        for count, probability, add in ((obstacle_count, obstacle_probability, self.add_obstacle),
+                                        (dirt_count, dirt_probability, self.add_dirt)):
+            if count is None:
+                count = rng.binomial(cells, probability)
+            rows = rng.integers(self.rows, size=count).tolist()
+            cols = rng.integers(self.cols, size=count).tolist()
+            for row, col in zip(rows, cols):
+                if (row, col) != agent_pos:
+                    add(row, col)
+
+
+# ====================================
+# SIMULATION ENGINE
+# ====================================
+
+class RandomWalkPolicy:
+    """Reactive policy: drive forward, turn right at anything in the way and
+    turn left or right at random after some moves to explore"""
+    
+    def __init__(self, turn_probability=0.15, seed=None):
+        self.turn_probability = turn_probability
+        self.random = random.Random(seed)
+    
+    def cleaned(self, sim, pos):
+        pass
+    
+    def act(self, sim, sense_result, target_pos):
+        if sense_result == "boundary" or sense_result == "obstacle":
+            sim.turn_right()
+            return
+        sim.forward()
+        # Occasionally turn to explore (free, not counted as a move)
+        if self.random.random() < self.turn_probability:
+            if self.random.random() < 0.5:
+                sim.agent.turn_left()
+            else:
+                sim.agent.turn_right()
+
+
+def distance_field(grid, sources):
+    """Multi-source BFS, level by level over the whole grid
+
+    Returns the padded passable mask and the distance from each padded cell
+    to the nearest `sources` cell (DistanceFieldPolicy.UNREACHABLE if none).
+    One cell of obstacle padding removes all bounds checks from neighbour
+    lookups.
+    """
+    passable = np.zeros((grid.shape[0] + 2, grid.shape[1] + 2), dtype=bool)
+    passable[1:-1, 1:-1] = grid != Room.OBSTACLE
+    dist = np.full(passable.shape, DistanceFieldPolicy.UNREACHABLE, dtype=np.int64)
+    frontier = np.zeros(passable.shape, dtype=bool)
+    frontier[1:-1, 1:-1] = sources & passable[1:-1, 1:-1]
+    level = 0
+    while frontier.any():
+        dist[frontier] = level
+        grown = np.zeros_like(frontier)
+        grown[1:, :] |= frontier[:-1, :]
+        grown[:-1, :] |= frontier[1:, :]
+        grown[:, 1:] |= frontier[:, :-1]
+        grown[:, :-1] |= frontier[:, 1:]
+        frontier = grown & passable & (dist == DistanceFieldPolicy.UNREACHABLE)
+        level += 1
+    return passable, dist
+
+
+def _distance_field_job(args):
+    return distance_field(*args)
+
+
+class DistanceFieldPolicy:
+    """Coverage policy that walks down a BFS distance field to the nearest dirt
+
+    The field holds, for every free cell, the number of moves to the closest
+    dirty cell (multi-source BFS over non-obstacle cells). The agent steps to
+    a neighbour one closer, preferring straight ahead over turning. When a
+    cell is cleaned only the cells whose shortest path ran through it are
+    repaired, instead of recomputing the whole field.
+    """
+    
+    UNREACHABLE = 1 << 30
+    
+    def __init__(self):
+        self.room = None
+        self.dist = None
+        self.passable = None
+        self.width = 0
+        self.repaired = 0
+    
+    def build(self, room, sources=None, field=None):
+        """Multi-source BFS from every dirty cell (or the `sources` mask)
+
+        `field` is a precomputed `distance_field` result, e.g. from a worker
+        process.
+        """
+        self.room = room
+        if field is None:
+            field = distance_field(room.grid, room.grid == Room.DIRTY if sources is None else sources)
+        passable, dist = field
+        self.width = room.cols + 2
+        self.passable = passable.ravel().tolist()
+        self.dist = dist.ravel().tolist()
+    
+    def index(self, row, col):
+        return (row + 1) * self.width + col + 1
+    
+    def remove_source(self, source):
+        """Repair the field after the dirt at `source` is cleaned
+
+        Cells whose every shortest path led to `source` are found in order of
+        distance (a cell is affected once all its neighbours one step closer
+        are), then re-labelled by Dijkstra from their unaffected neighbours.
+        """
+        dist = self.dist
+        if dist[source] != 0:
+            return  # Not one of this field's dirt cells
+        passable = self.passable
+        width = self.width
+        offsets = (-width, 1, width, -1)
+        affected = {source}
+        order = [source]
+        queue = deque(order)
+        while queue:
+            cell = queue.popleft()
+            below = dist[cell] + 1
+            for step in offsets:
+                v = cell + step
+                if dist[v] != below or v in affected or not passable[v]:
                     continue
-                rand = random.random()
-                if rand < obstacle_probability:
-                    self.add_obstacle(r, c)
-                elif rand < obstacle_probability + dirt_probability:
-                    self.add_dirt(r, c)
+                for w_step in offsets:
+                    w = v + w_step
+                    if dist[w] == below - 1 and w not in affected and passable[w]:
+                        break
+                else:
+                    affected.add(v)
+                    order.append(v)
+                    queue.append(v)
+        unreachable = self.UNREACHABLE
+        heap = []
+        for cell in order:
+            best = unreachable
+            for step in offsets:
+                w = cell + step
+                if passable[w] and w not in affected and dist[w] < best:
+                    best = dist[w]
+            best += 1
+            dist[cell] = best if best < unreachable else unreachable
+            if best < unreachable:
+                heap.append((best, cell))
+        heapq.heapify(heap)
+        while heap:
+            d, cell = heapq.heappop(heap)
+            if d > dist[cell]:
+                continue
+            d += 1
+            for step in offsets:
+                v = cell + step
+                if d < dist[v] and v in affected:
+                    dist[v] = d
+                    heapq.heappush(heap, (d, v))
+        self.repaired += len(order)
+    
+    def cleaned(self, sim, pos):
+        if self.room is sim.room:
+            self.remove_source(self.index(*pos))
+    
+    def next_move(self, agent):
+        """"forward", "turn_left" or "turn_right" down the field, or None if no dirt is reachable"""
+        cell = self.index(agent.row, agent.col)
+        dist = self.dist
+        if dist[cell] >= self.UNREACHABLE:
+            return None
+        width = self.width
+        steps = (-width, 1, width, -1)  # Same order as DIRECTIONS
+        closer = dist[cell] - 1
+        if dist[cell + steps[agent.direction]] == closer and self.passable[cell + steps[agent.direction]]:
+            return "forward"
+        elif dist[cell + steps[(agent.direction - 1) % 4]] == closer and self.passable[cell + steps[(agent.direction - 1) % 4]]:
+            return "turn_left"
+        return "turn_right"
+    
+    def act(self, sim, sense_result, target_pos):
+        if self.room is not sim.room:
+            self.build(sim.room)
+        move = self.next_move(sim.agent)
+        if move is None:
+            return False  # No dirt left that the agent can reach
+        getattr(sim, move)()
+        return True
+
+
+class VacuumSimulation:
+    """Headless Room + VacuumAgent + policy loop
+
+    Each `step()` cleans the current cell if it is dirty, otherwise senses
+    the cell ahead and lets the policy act on it. Returns an (event, sensed,
+    pos) triple: ("done", None, None) once the room is clean, ("stuck", None,
+    None) once the policy reports it cannot reach the remaining dirt,
+    ("cleaned", None, pos), or the move the policy made ("forward",
+    "turn_left", "turn_right") with the sense result it acted on
+    ("boundary", "obstacle", "dirty", "clean") and the cell ahead.
+
+    Policies implement `act(sim, sense_result, target_pos)`, returning False
+    when they give up, and `cleaned(sim, pos)`, called after each cleaning.
+    """
+    
+    def __init__(self, room, agent, policy=None):
+        self.room = room
+        self.agent = agent
+        if policy is None:
+            policy = DistanceFieldPolicy() if hasattr(room, "grid") else RandomWalkPolicy()
+        elif isinstance(policy, (DistanceFieldPolicy, TourPolicy)) and not hasattr(room, "grid"):
+            raise TypeError(f"{type(policy).__name__} needs a dense Room; "
+                            f"use RandomWalkPolicy with {type(room).__name__}")
+        self.policy = policy
+        self.action = None
+        self.steps = 0
+        self.stuck = False
+    
+    @property
+    def done(self):
+        return self.room.total_dirty == 0
+    
+    def sense(self):
+        """What is ahead of the agent, as in VacuumGUI.sense_environment"""
+        agent = self.agent
+        dr, dc = DIRECTIONS[agent.direction]
+        next_row = agent.row + dr
+        next_col = agent.col + dc
+        room = self.room
+        if not (0 <= next_row < room.rows and 0 <= next_col < room.cols):
+            return "boundary", None
+        cell = room.cell(next_row, next_col)
+        if cell == Room.OBSTACLE:
+            return "obstacle", (next_row, next_col)
+        elif cell == Room.DIRTY:
+            return "dirty", (next_row, next_col)
+        return "clean", (next_row, next_col)
+    
+    def forward(self):
+        agent = self.agent
+        dr, dc = DIRECTIONS[agent.direction]
+        agent.row += dr
+        agent.col += dc
+        agent.moves_count += 1
+        self.action = "forward"
+    
+    def turn_right(self):
+        self.agent.turn_right()
+        self.agent.moves_count += 1
+        self.action = "turn_right"
+    
+    def turn_left(self):
+        self.agent.turn_left()
+        self.agent.moves_count += 1
+        self.action = "turn_left"
+    
+    def step(self):
+        if self.room.total_dirty == 0:
+            return "done", None, None
+        if self.stuck:
+            return "stuck", None, None
+        self.steps += 1
+        agent = self.agent
+        if self.room.clean_cell(agent.row, agent.col):
+            agent.cleaned_count += 1
+            self.policy.cleaned(self, (agent.row, agent.col))
+            return "cleaned", None, (agent.row, agent.col)
+        sense_result, target_pos = self.sense()
+        self.action = None
+        if self.policy.act(self, sense_result, target_pos) is False:
+            self.stuck = True
+            self.steps -= 1
+            return "stuck", None, None
+        return self.action, sense_result, target_pos
+    
+    def run(self, max_steps=None):
+        """Step until the room is clean or `max_steps` steps; returns steps taken"""
+        start = self.steps
+        step = self.step
+        while max_steps is None or self.steps - start < max_steps:
+            if step()[0] in ("done", "stuck"):
+                break
+        return self.steps - start
+
+
+def random_simulation(rows, cols, dirt_probability=0.35, obstacle_probability=0.12, seed=None, policy=None):
+    """A randomized room with the agent on a random free cell"""
+    rng = np.random.default_rng(seed)
+    agent = VacuumAgent(int(rng.integers(rows)), int(rng.integers(cols)))
+    room = Room(rows, cols)
+    room.randomize(dirt_probability, obstacle_probability, agent.get_position(), seed=rng)
+    return VacuumSimulation(room, agent, policy)
+
+
+# ====================================
+# TOUR PLANNING
+# ====================================
+
+def padded_passable(room):
+    """Flat bool array of free cells with a one-cell obstacle border, and its row width"""
+    passable = np.zeros((room.rows + 2, room.cols + 2), dtype=bool)
+    passable[1:-1, 1:-1] = room.grid != Room.OBSTACLE
+    return passable.ravel(), room.cols + 2
+
+
+def _distance_rows(args):
+    """BFS blocks for the 64-source groups of `points` starting at `firsts`
+
+    A group's sources are bits of one uint64 per cell and it only needs the
+    points from its own first source on (the matrix is symmetric), so it
+    stops as soon as all of those are reached by every source in it. Each
+    level sweeps just the band of rows reached so far: the sources' rows
+    grown by one row per level. Returns (first, block) pairs.
+    """
+    passable, width, points, firsts = args
+    height = passable.size // width
+    free = np.where(passable, ~np.uint64(0), np.uint64(0))
+    buffer = np.empty(passable.size, dtype=np.uint64)
+    blocks = []
+    for first in firsts:
+        group = points[first:first + 64]
+        targets = points[first:]
+        block = np.full((len(group), len(targets)), -1, dtype=np.int32)
+        frontier = np.zeros(passable.size, dtype=np.uint64)
+        frontier[group] = np.left_shift(np.uint64(1), np.arange(len(group), dtype=np.uint64))
+        unreached = free & ~frontier
+        top = int(group.min()) // width
+        bottom = int(group.max()) // width + 1
+        pending = block.size
+        level = 0
+        while True:
+            hit = np.flatnonzero(frontier[targets])
+            if hit.size:
+                words = frontier[targets[hit]].astype("<u8").view(np.uint8).reshape(-1, 8)
+                target, source = np.nonzero(np.unpackbits(words, axis=1, bitorder="little"))
+                block[source, hit[target]] = level
+                pending -= target.size
+                if not pending:
+                    break
+            top, bottom = max(top - 1, 0), min(bottom + 1, height)
+            low, high = top * width, bottom * width
+            old = frontier[low:high]
+            grown = buffer[:high - low]
+            grown[:width] = 0
+            grown[width:] = old[:-width]
+            grown[:-width] |= old[width:]
+            grown[1:] |= old[:-1]
+            grown[:-1] |= old[1:]
+            grown &= unreached[low:high]
+            old[...] = grown
+            if not grown.any():
+                break
+            unreached[low:high] ^= grown
+            level += 1
+        blocks.append((first, block))
+    return blocks
+
+
+def distance_matrix(room, cells, workers=None):
+    """All-pairs BFS move counts between `cells` (-1 where unreachable)
+
+    The BFS runs bit-parallel for 64 sources per pass over the cells in
+    tile order, filling the upper triangle and mirroring it; with `workers`
+    > 1 the groups are split across a process pool.
+    """
+    passable, width = padded_passable(room)
+    points, inverse = np.unique([(r + 1) * width + c + 1 for r, c in cells], return_inverse=True)
+    # Tiles holding about one group each keep every group's rows close together
+    tile = max(1, int(np.sqrt(64 * passable.size / len(points))))
+    point_rows, point_cols = np.divmod(points, width)
+    points = points[np.lexsort((point_cols, point_rows, point_cols // tile, point_rows // tile))]
+    firsts = list(range(0, len(points), 64))
+    if not workers or workers <= 1 or len(firsts) < 2 * workers:
+        blocks = _distance_rows((passable, width, points, firsts))
+    else:
+        jobs = [(passable, width, points, firsts[k::workers]) for k in range(workers)]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            blocks = [block for part in pool.map(_distance_rows, jobs) for block in part]
+    upper = np.full((len(points), len(points)), -1, dtype=np.int32)
+    for first, block in blocks:
+        upper[first:first + len(block), first:] = block
+    below = np.tril_indices(len(points), -1)
+    upper[below] = upper.T[below]
+    # Back from sorted, de-duplicated points to the order of `cells`
+    position = np.empty(len(points), dtype=np.int64)
+    position[np.searchsorted(np.unique(points), points)] = np.arange(len(points))
+    order = position[inverse]
+    return upper[np.ix_(order, order)]
+
+
+def tour_length(dist, tour):
+    return int(dist[tour[:-1], tour[1:]].sum())
+
+
+def improve_tour(dist, tour, deadline):
+    """2-opt and Or-opt moves on an open path whose ends stay fixed
+
+    Each pass tries, for every position, all 2-opt reversals and all
+    relocations of a 1-3 city segment at once with NumPy, applying the best
+    improving move. Stops at a local optimum or at `deadline`.
+    """
+    tour = np.array(tour)
+    n = len(tour)
+    improved = True
+    while improved and time.perf_counter() < deadline:
+        improved = False
+        for i in range(n - 3):
+            a, b = tour[i], tour[i + 1]
+            # 2-opt: reverse tour[i+1..j] for every j
+            c = tour[i + 2:n - 1]
+            d = tour[i + 3:n]
+            delta = dist[a, c] + dist[b, d] - dist[a, b] - dist[c, d]
+            j = int(np.argmin(delta))
+            if delta[j] < 0:
+                j += i + 2
+                tour[i + 1:j + 1] = tour[i + 1:j + 1][::-1].copy()
+                improved = True
+                continue
+            # Or-opt: move tour[i+1..i+length] between two other neighbours
+            for length in (1, 2, 3):
+                if i + length + 1 >= n:
+                    break
+                first, last, after = tour[i + 1], tour[i + length], tour[i + length + 1]
+                gain = dist[a, first] + dist[last, after] - dist[a, after]
+                rest = np.concatenate([tour[:i + 1], tour[i + length + 1:]])
+                left, right = rest[:-1], rest[1:]
+                forward = dist[left, first] + dist[last, right] - dist[left, right]
+                backward = dist[left, last] + dist[first, right] - dist[left, right]
+                cost = np.minimum(forward, backward)
+                k = int(np.argmin(cost))
+                if cost[k] < gain:
+                    segment = tour[i + 1:i + length + 1]
+                    if backward[k] < forward[k]:
+                        segment = segment[::-1]
+                    tour = np.concatenate([rest[:k + 1], segment, rest[k + 1:]])
+                    improved = True
+                    break
+            if time.perf_counter() >= deadline:
+                break
+    return tour.tolist()
+
+
+def plan_tour(room, start, time_budget=1.0, workers=None):
+    """Order in which to visit every reachable dirty cell, starting at `start`
+
+    Nearest-neighbour construction on the BFS distance matrix, then 2-opt and
+    Or-opt improvement for at most `time_budget` seconds. Returns the list of
+    cells (without `start`) and the tour length in moves.
+    """
+    dirt = [tuple(cell) for cell in np.argwhere(room.grid == Room.DIRTY).tolist() if tuple(cell) != start]
+    cells = [start] + dirt
+    dist = distance_matrix(room, cells, workers)
+    reachable = np.flatnonzero(dist[0] >= 0)
+    cells = [cells[i] for i in reachable]
+    # A free end node at zero distance from everything pins the path's last city
+    n = len(cells)
+    full = np.zeros((n + 1, n + 1), dtype=np.int64)
+    full[:n, :n] = dist[np.ix_(reachable, reachable)]
+    
+    tour = [0]
+    unvisited = np.ones(n, dtype=bool)
+    unvisited[0] = False
+    for _ in range(n - 1):
+        row = np.where(unvisited, full[tour[-1], :n], np.iinfo(np.int64).max)
+        nearest = int(np.argmin(row))
+        tour.append(nearest)
+        unvisited[nearest] = False
+    tour.append(n)
+    tour = improve_tour(full, tour, time.perf_counter() + time_budget)
+    return [cells[i] for i in tour[1:-1]], tour_length(full, np.array(tour))
+
+
+def shortest_path(room, start, goal, direction=0, passable=None):
+    """Cells from `start` to `goal` (inclusive) by BFS, or None if unreachable
+
+    The BFS runs from `goal` and stops as soon as it reaches `start`, so a
+    leg costs time for the cells within its own length, not for the whole
+    room. Among shortest paths it keeps heading `direction` whenever that is
+    still a shortest step, so legs take few turns. `passable` is a
+    precomputed (padded cell list, width) pair from `padded_passable`.
+    """
+    if passable is None:
+        cells, width = padded_passable(room)
+        passable = (cells.tolist(), width)
+    free, width = passable
+    offsets = (-width, 1, width, -1)  # Same order as DIRECTIONS
+    origin = (start[0] + 1) * width + start[1] + 1
+    source = (goal[0] + 1) * width + goal[1] + 1
+    dist = {source: 0}
+    queue = deque([source])
+    while queue and origin not in dist:
+        cell = queue.popleft()
+        d = dist[cell] + 1
+        for step in offsets:
+            v = cell + step
+            if free[v] and v not in dist:
+                dist[v] = d
+                queue.append(v)
+    if origin not in dist:
+        return None
+    cell = origin
+    path = [start]
+    row, col = start
+    while dist[cell] > 0:
+        closer = dist[cell] - 1
+        for turn in (0, 1, 3, 2):
+            heading = (direction + turn) % 4
+            if dist.get(cell + offsets[heading]) == closer:
+                break
+        direction = heading
+        cell += offsets[heading]
+        row += DIRECTIONS[heading][0]
+        col += DIRECTIONS[heading][1]
+        path.append((row, col))
+    return path
+
+
+def tour_moves(room, position, direction, cells):
+    """Expand a visiting order into "turn_left" / "turn_right" / "forward" moves"""
+    free, width = padded_passable(room)
+    passable = (free.tolist(), width)
+    moves = []
+    for goal in cells:
+        path = shortest_path(room, position, goal, direction, passable)
+        if path is None:
+            continue
+        for cell in path[1:]:
+            heading = DIRECTIONS.index((cell[0] - position[0], cell[1] - position[1]))
+            turn = (heading - direction) % 4
+            if turn == 3:
+                moves.append("turn_left")
+            else:
+                moves.extend(["turn_right"] * turn)
+            moves.append("forward")
+            direction = heading
+            position = cell
+    return moves
+
+
+class TourPolicy:
+    """Follows a precomputed tour through every dirty cell (see plan_tour)"""
+    
+    def __init__(self, time_budget=1.0, workers=None):
+        self.time_budget = time_budget
+        self.workers = workers
+        self.room = None
+        self.moves = deque()
+        self.tour = []
+        self.tour_length = 0
+    
+    def plan(self, sim):
+        self.room = sim.room
+        start = sim.agent.get_position()
+        self.tour, self.tour_length = plan_tour(sim.room, start, self.time_budget, self.workers)
+        self.moves = deque(tour_moves(sim.room, start, sim.agent.direction, self.tour))
+    
+    def cleaned(self, sim, pos):
+        pass
+    
+    def act(self, sim, sense_result, target_pos):
+        if self.room is not sim.room:
+            self.plan(sim)
+        if not self.moves:
+            return False  # Tour finished: whatever dirt is left is unreachable
+        getattr(sim, self.moves.popleft())()
+        return True
+
+
+# ====================================
+# MULTI-AGENT CLEANING
+# ====================================
+
+class MultiAgentSimulation:
+    """K agents cleaning one Room, each on its own share of the dirt
+
+    Free cells are split into a Voronoi partition on BFS distance from the
+    agents (ties go to the lower agent index) and every agent follows a
+    DistanceFieldPolicy field over the dirt in its region, confined to the
+    region and a one-cell ring around it. An agent that runs out of dirt
+    takes over part of the region with the most dirt left: the two regions
+    are split again between the two agents and only their fields are
+    rebuilt. The whole room is partitioned again from the agents' current
+    positions only once the dirt is down to `repartition` times what it was
+    at the last partition, or when no agent can move. Agents act in index
+    order each tick and never enter a cell another agent occupies; an agent
+    blocked for `patience` ticks side-steps to a random free neighbour. With
+    `workers` > 1 the per-agent fields of a partition are built in a
+    process pool.
+
+    `step()` returns "done", "stuck" (remaining dirt unreachable) or "tick";
+    per-agent moves, cleaned counts and waits are in `stats()`.
+    """
+    
+    def __init__(self, room, agents, workers=None, patience=3, seed=None, repartition=0.5):
+        positions = [agent.get_position() for agent in agents]
+        if len(set(positions)) != len(positions):
+            raise ValueError("Agents must start on different cells")
+        if not hasattr(room, "grid"):
+            raise TypeError(f"MultiAgentSimulation needs a dense Room, not {type(room).__name__}")
+        self.room = room
+        self.agents = agents
+        self.workers = workers
+        self.patience = patience
+        self.repartition = repartition
+        self.random = random.Random(seed)
+        self.policies = [DistanceFieldPolicy() for _ in agents]
+        self.waits = [0] * len(agents)
+        self.blocked = [0] * len(agents)
+        self.ticks = 0
+        self.partitions = 0
+        self.handoffs = 0
+        self.partitioned_dirt = None
+        self.owner = None
+        self.region_dirt = [0] * len(agents)
+        # cleaned_count of each agent at its last handoff: no new share until it cleans again
+        self.handed = [-1] * len(agents)
+        # Agents still crossing their old region towards a new share
+        self.travelling = [False] * len(agents)
+        self.stuck = False
+    
+    @property
+    def done(self):
+        return self.room.total_dirty == 0
+    
+    def regions(self, members=None, within=None):
+        """Owner agent index of every cell (-1 for obstacles and unclaimed cells)
+
+        One BFS grows from the agents in `members` (default all) at once,
+        through the free cells of the `within` mask if given; a cell reached
+        by several agents in the same level goes to the lowest index.
+        """
+        members = range(len(self.agents)) if members is None else members
+        grid = self.room.grid
+        top, left = 0, 0
+        bottom, right = grid.shape
+        if within is not None:
+            # Only sweep the box holding `within` and the agents
+            rows = [self.agents[k].row for k in members]
+            cols = [self.agents[k].col for k in members]
+            rows += np.flatnonzero(within.any(axis=1))[[0, -1]].tolist()
+            cols += np.flatnonzero(within.any(axis=0))[[0, -1]].tolist()
+            top, bottom, left, right = min(rows), max(rows) + 1, min(cols), max(cols) + 1
+        window = grid[top:bottom, left:right]
+        passable = np.zeros((window.shape[0] + 2, window.shape[1] + 2), dtype=bool)
+        passable[1:-1, 1:-1] = window != Room.OBSTACLE
+        if within is not None:
+            passable[1:-1, 1:-1] &= within[top:bottom, left:right]
+        # The frontier is a list of flat cell indices, so each cell is handled once
+        width = passable.shape[1]
+        free = passable.ravel()
+        owner = np.full(passable.size, -1, dtype=np.int32)
+        frontier = np.array([(self.agents[k].row - top + 1) * width + self.agents[k].col - left + 1
+                             for k in members])
+        owner[frontier] = list(members)
+        steps = np.array([-width, 1, width, -1])
+        while frontier.size:
+            cells = (frontier[:, None] + steps).ravel()
+            labels = np.repeat(owner[frontier], 4)
+            keep = free[cells] & (owner[cells] < 0)
+            order = np.argsort(labels[keep], kind="stable")
+            # A stable unique keeps each cell's first, lowest-index claim
+            frontier, first = np.unique(cells[keep][order], return_index=True)
+            owner[frontier] = labels[keep][order][first]
+        owner = owner.reshape(passable.shape)
+        if within is None:
+            return owner[1:-1, 1:-1]
+        full = np.full(grid.shape, -1, dtype=np.int32)
+        full[top:bottom, left:right] = owner[1:-1, 1:-1]
+        return full
+    
+    @staticmethod
+    def ring(mask):
+        """`mask` grown by one cell in the four directions"""
+        grown = mask.copy()
+        grown[1:, :] |= mask[:-1, :]
+        grown[:-1, :] |= mask[1:, :]
+        grown[:, 1:] |= mask[:, :-1]
+        grown[:, :-1] |= mask[:, 1:]
+        return grown
+    
+    def field_job(self, k, confined=True, through=None):
+        """distance_field arguments for agent k: its region's dirt, walking in
+        the region (and the `through` mask) with a one-cell ring around it,
+        or anywhere if not `confined`"""
+        grid = self.room.grid
+        region = self.owner == k
+        sources = region & (grid == Room.DIRTY)
+        if not confined:
+            return grid, sources
+        allowed = self.ring(region if through is None else region | through)
+        allowed[self.agents[k].row, self.agents[k].col] = True
+        return np.where(allowed, grid, Room.OBSTACLE), sources
+    
+    def partition(self):
+        self.owner = self.regions()
+        self.travelling = [False] * len(self.agents)
+        jobs = [self.field_job(k) for k in range(len(self.agents))]
+        self.region_dirt = [int(np.count_nonzero(sources)) for _, sources in jobs]
+        if self.workers and self.workers > 1:
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                fields = list(pool.map(_distance_field_job, jobs))
+        else:
+            fields = [distance_field(*job) for job in jobs]
+        for policy, field in zip(self.policies, fields):
+            policy.build(self.room, field=field)
+        self.partitions += 1
+        self.partitioned_dirt = self.room.total_dirty
+    
+    def hand_off(self, k):
+        """Give idle agent k part of the region with the most dirt left
+
+        The two regions are split again by a two-agent BFS within them and
+        only the two fields are rebuilt. k's own, cleaned region is given up:
+        k crosses it to the new share and its field is confined to the share
+        once it cleans there (see step), so repairs never span the old
+        region. If k's own region still has dirt it cannot reach from where
+        it stands, its field is rebuilt over the whole room instead. Returns
+        False when nothing changed; k gets nothing new until it has cleaned a
+        cell since its last share.
+        """
+        agent = self.agents[k]
+        if agent.cleaned_count == self.handed[k]:
+            return False
+        self.handed[k] = agent.cleaned_count
+        if self.region_dirt[k]:
+            self.policies[k].build(self.room, field=distance_field(*self.field_job(k, confined=False)))
+            return True
+        donors = sorted((j for j in range(len(self.agents)) if j != k and self.region_dirt[j] > 1),
+                        key=lambda j: -self.region_dirt[j])
+        dirty = self.room.grid == Room.DIRTY
+        region = self.owner == k
+        region[agent.row, agent.col] = True
+        near = self.owner[self.ring(region)]
+        for donor in donors:
+            if not (near == donor).any():
+                continue  # Only take over from a region next to k's
+            union = region | (self.owner == donor)
+            split = self.regions((k, donor), union)
+            share = (split == k) & (self.owner == donor)
+            taken = int(np.count_nonzero(dirty & share))
+            if not taken:
+                continue  # k cannot reach that region through the two regions
+            old = self.owner == k
+            self.owner[old] = -1
+            self.owner[share] = k
+            self.region_dirt[k] += taken
+            self.region_dirt[donor] -= taken
+            self.policies[k].build(self.room, field=distance_field(*self.field_job(k, through=old)))
+            self.policies[donor].build(self.room, field=distance_field(*self.field_job(donor)))
+            self.travelling[k] = True
+            self.handoffs += 1
+            return True
+        return False
+    
+    def step(self):
+        if self.room.total_dirty == 0:
+            return "done"
+        if self.stuck:
+            return "stuck"
+        if self.partitioned_dirt is None:
+            self.partition()
+        self.ticks += 1
+        occupied = {agent.get_position() for agent in self.agents}
+        idle = []
+        for k, agent in enumerate(self.agents):
+            if self.room.clean_cell(agent.row, agent.col):
+                agent.cleaned_count += 1
+                owner = self.owner[agent.row, agent.col]
+                if owner >= 0:
+                    self.region_dirt[owner] -= 1
+                cell = self.policies[k].index(agent.row, agent.col)
+                for policy in self.policies:
+                    policy.remove_source(cell)
+                if self.travelling[k] and owner == k:
+                    # Arrived at the new share: stop keeping the old region in the field
+                    self.travelling[k] = False
+                    self.policies[k].build(self.room, field=distance_field(*self.field_job(k)))
+                continue
+            move = self.policies[k].next_move(agent)
+            if move is None:
+                idle.append(k)
+                self.waits[k] += 1
+                continue
+            if move != "forward":
+                agent.turn_left() if move == "turn_left" else agent.turn_right()
+                agent.moves_count += 1
+                continue
+            dr, dc = DIRECTIONS[agent.direction]
+            target = (agent.row + dr, agent.col + dc)
+            if target in occupied:
+                self.waits[k] += 1
+                self.blocked[k] += 1
+                if self.blocked[k] >= self.patience:
+                    self.side_step(k, occupied)
+                continue
+            self.blocked[k] = 0
+            occupied.discard(agent.get_position())
+            agent.row, agent.col = target
+            agent.moves_count += 1
+            occupied.add(target)
+        if idle and self.room.total_dirty:
+            if self.room.total_dirty <= self.partitioned_dirt * self.repartition:
+                self.partition()
+            elif len(idle) == len(self.agents):
+                # Nobody can move: re-split from here, unless nothing was cleaned since the last split
+                if self.room.total_dirty < self.partitioned_dirt:
+                    self.partition()
+                else:
+                    self.stuck = True
+            else:
+                for k in idle:
+                    self.hand_off(k)
+        return "tick"
+    
+    def side_step(self, k, occupied):
+        """Move agent k to a random free neighbour to break a standoff"""
+        agent = self.agents[k]
+        options = []
+        for heading, (dr, dc) in enumerate(DIRECTIONS):
+            cell = (agent.row + dr, agent.col + dc)
+            if cell not in occupied and self.room.is_valid_move(*cell):
+                options.append((heading, cell))
+        if not options:
+            return
+        heading, cell = self.random.choice(options)
+        occupied.discard(agent.get_position())
+        agent.direction = heading
+        agent.row, agent.col = cell
+        agent.moves_count += 1
+        occupied.add(cell)
+        self.blocked[k] = 0
+    
+    def run(self, max_ticks=None):
+        """Tick until the room is clean or stuck; returns ticks taken"""
+        start = self.ticks
+        while max_ticks is None or self.ticks - start < max_ticks:
+            if self.step() != "tick":
+                break
+        return self.ticks - start
+    
+    def stats(self):
+        return [{"agent": k, "moves": agent.moves_count, "cleaned": agent.cleaned_count, "waits": self.waits[k]}
+                for k, agent in enumerate(self.agents)]
+
+
+def random_multi_agent(rows, cols, agents, dirt_probability=0.35, obstacle_probability=0.12,
+                       seed=None, workers=None):
+    """A randomized room with `agents` agents on distinct free cells"""
+    rng = np.random.default_rng(seed)
+    room = Room(rows, cols)
+    room.randomize(dirt_probability, obstacle_probability, None, seed=rng)
+    free = np.flatnonzero(room.grid.ravel() != Room.OBSTACLE)
+    starts = rng.choice(free, size=agents, replace=False)
+    team = [VacuumAgent(int(cell) // cols, int(cell) % cols) for cell in starts]
+    return MultiAgentSimulation(room, team, workers=workers, seed=seed)
+
+
+# ====================================
+# BATCHED SIMULATION
+# ====================================
+
+# Per-episode outcome codes returned by BatchSimulation.step
+EVENT_DONE = 0
+EVENT_CLEANED = 1
+SENSE_BOUNDARY = 2
+SENSE_OBSTACLE = 3
+SENSE_DIRTY = 4
+SENSE_CLEAN = 5
+
+
+class BatchSimulation:
+    """B rooms stepped in lock-step with the RandomWalkPolicy rules, in NumPy
+
+    `grids` is a (B, rows, cols) uint8 array of Room cell types and `rows`,
+    `cols`, `directions` are length-B agent vectors. Each `step()` advances
+    every unfinished episode once: clean the current cell if dirty, else
+    sense ahead (boundary / obstacle / dirty / clean exactly as
+    VacuumSimulation.sense), turn right when blocked, otherwise move forward
+    and maybe turn at random. `moves` and `cleaned` hold per-episode counts.
+    The rooms are cleaned in a copy of `grids`; with `copy=False` a
+    contiguous uint8 `grids` is cleaned in place instead.
+    """
+    
+    def __init__(self, grids, rows, cols, directions=None, turn_probability=0.15, seed=None, copy=True):
+        if copy:
+            self.grids = np.array(grids, dtype=np.uint8, order="C")
+        else:
+            self.grids = np.ascontiguousarray(grids, dtype=np.uint8)
+        self.batch, self.height, self.width = self.grids.shape
+        self.cells = self.grids.reshape(self.batch, -1)
+        self.rows = np.asarray(rows, dtype=np.int64).copy()
+        self.cols = np.asarray(cols, dtype=np.int64).copy()
+        if directions is None:
+            directions = np.zeros(self.batch, dtype=np.int64)
+        self.directions = np.asarray(directions, dtype=np.int64).copy()
+        self.turn_probability = turn_probability
+        self.rng = np.random.default_rng(seed)
+        self.dirty = np.count_nonzero(self.cells == Room.DIRTY, axis=1)
+        self.moves = np.zeros(self.batch, dtype=np.int64)
+        self.cleaned = np.zeros(self.batch, dtype=np.int64)
+        self.steps = np.zeros(self.batch, dtype=np.int64)
+        self.episodes = np.arange(self.batch)
+        self.offsets = np.array(DIRECTIONS, dtype=np.int64)
+    
+    @classmethod
+    def random(cls, batch, rows, cols, dirt_probability=0.35, obstacle_probability=0.12, seed=None, **options):
+        """`batch` rooms drawn like Room.randomize, agents on random cells"""
+        rng = np.random.default_rng(seed)
+        agent_rows = rng.integers(rows, size=batch)
+        agent_cols = rng.integers(cols, size=batch)
+        rand = rng.random((batch, rows, cols))
+        rand[np.arange(batch), agent_rows, agent_cols] = 1.0
+        grids = np.zeros((batch, rows, cols), dtype=np.uint8)
+        grids[rand < obstacle_probability + dirt_probability] = Room.DIRTY
+        grids[rand < obstacle_probability] = Room.OBSTACLE
+        return cls(grids, agent_rows, agent_cols, seed=rng, copy=False, **options)
+    
+    @property
+    def done(self):
+        return self.dirty == 0
+    
+    def step(self):
+        """Advance every unfinished episode one step; returns the event codes"""
+        events = np.full(self.batch, EVENT_DONE, dtype=np.int8)
+        active = self.episodes[self.dirty > 0]
+        if not active.size:
+            return events
+        self.steps[active] += 1
+        rows = self.rows[active]
+        cols = self.cols[active]
+        here = rows * self.width + cols
+        on_dirt = self.cells[active, here] == Room.DIRTY
+        
+        cleaning = active[on_dirt]
+        self.cells[cleaning, here[on_dirt]] = Room.CLEAN
+        self.dirty[cleaning] -= 1
+        self.cleaned[cleaning] += 1
+        events[cleaning] = EVENT_CLEANED
+        
+        sensing = active[~on_dirt]
+        heading = self.directions[sensing]
+        next_rows = self.rows[sensing] + self.offsets[heading, 0]
+        next_cols = self.cols[sensing] + self.offsets[heading, 1]
+        inside = (next_rows >= 0) & (next_rows < self.height) & (next_cols >= 0) & (next_cols < self.width)
+        ahead = np.full(sensing.size, Room.OBSTACLE, dtype=np.uint8)
+        ahead[inside] = self.cells[sensing[inside], next_rows[inside] * self.width + next_cols[inside]]
+        sensed = np.select([~inside, ahead == Room.OBSTACLE, ahead == Room.DIRTY],
+                           [SENSE_BOUNDARY, SENSE_OBSTACLE, SENSE_DIRTY], SENSE_CLEAN)
+        events[sensing] = sensed
+        self.moves[sensing] += 1
+        
+        blocked = sensed <= SENSE_OBSTACLE
+        self.directions[sensing[blocked]] = (heading[blocked] + 1) % 4
+        moving = sensing[~blocked]
+        self.rows[moving] = next_rows[~blocked]
+        self.cols[moving] = next_cols[~blocked]
+        # Occasionally turn to explore, left or right with equal odds
+        draws = self.rng.random((2, moving.size))
+        turning = draws[0] < self.turn_probability
+        turn = np.where(draws[1] < 0.5, 3, 1)
+        self.directions[moving[turning]] = (self.directions[moving[turning]] + turn[turning]) % 4
+        return events
+    
+    def run(self, max_steps):
+        """Step until every room is clean or `max_steps` lock-steps have run"""
+        for _ in range(max_steps):
+            if not self.dirty.any():
+                break
+            self.step()
+        return self.moves, self.cleaned
 
 
 class VacuumGUI:
@@ -106,9 +1272,10 @@ class VacuumGUI:
         self.grid_size = 8
         self.cell_size = 60
         
-        # Initialize room and agent
+        # Initialize room and agent; the simulation owns them, the GUI only draws
         self.room = Room(self.grid_size, self.grid_size)
         self.agent = VacuumAgent(0, 0)
+        self.simulation = VacuumSimulation(self.room, self.agent)
         
         # Colors
         self.colors = {
@@ -223,6 +1390,7 @@ class VacuumGUI:
         )
         self.room.randomize(dirt_probability=0.35, obstacle_probability=0.12, 
                            agent_pos=self.agent.get_position())
+        self.simulation = VacuumSimulation(self.room, self.agent)
         self.detected_obstacle = None
         self.update_labels()
 
@@ -309,25 +1477,17 @@ class VacuumGUI:
 
     def sense_environment(self):
         """Agent senses what's ahead"""
-        next_row, next_col = self.agent.move_forward(self.grid_size)
-        
-        # Check for obstacles or boundaries
-        if not (0 <= next_row < self.grid_size and 0 <= next_col < self.grid_size):
-            return "boundary", None
-        elif self.room.is_obstacle(next_row, next_col):
-            return "obstacle", (next_row, next_col)
-        elif self.room.is_dirty(next_row, next_col):
-            return "dirty", (next_row, next_col)
-        else:
-            return "clean", (next_row, next_col)
+        return self.simulation.sense()
 
     def clean_step(self):
-        """Execute one cleaning step"""
+        """Advance the simulation one step and show what happened"""
         if not self.is_running:
             return
         
+        event, sensed, target_pos = self.simulation.step()
+        
         # Check if room is clean
-        if self.room.total_dirty == 0:
+        if event == "done":
             self.status_label.config(text="🎉 Room is CLEAN! All done!", fg="#16c79a")
             self.detect_label.config(text="")
             self.is_running = False
@@ -336,11 +1496,16 @@ class VacuumGUI:
             self.draw_room()
             return
         
-        # Clean current cell if dirty
-        current_pos = self.agent.get_position()
-        if self.room.is_dirty(current_pos[0], current_pos[1]):
-            self.room.clean_cell(current_pos[0], current_pos[1])
-            self.agent.cleaned_count += 1
+        if event == "stuck":
+            self.status_label.config(text="🚧 Remaining dirt is unreachable", fg="#e94560")
+            self.detect_label.config(text="")
+            self.is_running = False
+            self.start_btn.config(state="normal", bg="#16c79a")
+            self.detected_obstacle = None
+            self.draw_room()
+            return
+        
+        if event == "cleaned":
             self.status_label.config(text="🧹 Cleaning current cell...", fg="#16c79a")
             self.detected_obstacle = None
             self.detect_label.config(text="")
@@ -349,52 +1514,106 @@ class VacuumGUI:
             self.root.after(400, self.clean_step)
             return
         
-        # Sense environment
-        sense_result, target_pos = self.sense_environment()
-        
-        if sense_result == "boundary":
-            self.detect_label.config(text="⚠️ Detected: BOUNDARY ahead! Turning...")
-            self.status_label.config(text="🔄 Avoiding boundary", fg="#f39c12")
-            self.detected_obstacle = None
-            self.agent.turn_right()
-            self.agent.moves_count += 1
-        
-        elif sense_result == "obstacle":
-            self.detected_obstacle = target_pos
-            self.detect_label.config(text=f"⚠️ Detected: OBSTACLE at ({target_pos[0]}, {target_pos[1]})! Turning...")
-            self.status_label.config(text="🔄 Avoiding obstacle", fg="#f39c12")
-            self.agent.turn_right()
-            self.agent.moves_count += 1
+        # What the agent sensed ahead...
+        self.detected_obstacle = target_pos if sensed == "obstacle" else None
+        if sensed == "boundary":
+            self.detect_label.config(text="⚠️ Detected: BOUNDARY ahead!")
+        elif sensed == "obstacle":
+            self.detect_label.config(text=f"⚠️ Detected: OBSTACLE at ({target_pos[0]}, {target_pos[1]})!")
+        elif sensed == "dirty":
+            self.detect_label.config(text=f"👀 Found DIRT at ({target_pos[0]}, {target_pos[1]})!")
+        else:
+            self.detect_label.config(text="")
         
+        # ...and the move the policy actually made
+        if event == "forward":
+            text = "➡️ Moving to dirty cell" if sensed == "dirty" else "➡️ Moving forward"
+            self.status_label.config(text=text, fg="#16c79a")
+        elif sensed in ("boundary", "obstacle"):
+            self.status_label.config(text=f"🔄 Avoiding {sensed}", fg="#f39c12")
         else:
-            # Move forward
-            self.detected_obstacle = None
-            next_row, next_col = self.agent.move_forward(self.grid_size)
-            self.agent.row = next_row
-            self.agent.col = next_col
-            self.agent.moves_count += 1
-            
-            if sense_result == "dirty":
-                self.detect_label.config(text=f"👀 Found DIRT at ({next_row}, {next_col})!")
-                self.status_label.config(text="➡️ Moving to dirty cell", fg="#16c79a")
-            else:
-                self.detect_label.config(text="")
-                self.status_label.config(text="➡️ Moving forward", fg="#16c79a")
-            
-            # Occasionally turn to explore
-            if random.random() < 0.15:
-                if random.random() < 0.5:
-                    self.agent.turn_left()
-                else:
-                    self.agent.turn_right()
+            side = "left" if event == "turn_left" else "right"
+            self.status_label.config(text=f"🔄 Turning {side}", fg="#f39c12")
         
         self.update_labels()
         self.draw_room()
         self.root.after(300, self.clean_step)
 
 
-# Run the application
-if __name__ == "__main__":
+POLICIES = {"distance": DistanceFieldPolicy, "random": RandomWalkPolicy, "tour": TourPolicy}
+
+
+def benchmark_policies(sizes=(100, 300), seeds=(0, 1, 2), max_steps=5000000):
+    """Moves per cleaned cell and time per step of each policy on random rooms"""
+    for size in sizes:
+        for name, policy_class in POLICIES.items():
+            moves = cleaned = steps = 0
+            elapsed = 0.0
+            for seed in seeds:
+                sim = random_simulation(size, size, seed=seed, policy=policy_class())
+                start = time.perf_counter()
+                steps += sim.run(max_steps)
+                elapsed += time.perf_counter() - start
+                moves += sim.agent.moves_count
+                cleaned += sim.agent.cleaned_count
+            print(f"{size}x{size} {name:>8}: {moves / max(cleaned, 1):8.2f} moves/cleaned cell, "
+                  f"{elapsed / max(steps, 1) * 1e6:6.2f} us/step, {elapsed:6.1f}s total")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Vacuum cleaner agent (GUI by default)")
+    parser.add_argument("--headless", action="store_true", help="run one simulated episode without a display")
+    parser.add_argument("--size", type=int, default=100, help="room rows and columns for --headless")
+    parser.add_argument("--steps", type=int, default=1000000, help="step limit for --headless")
+    parser.add_argument("--seed", type=int, default=None, help="random seed for --headless")
+    parser.add_argument("--policy", default="distance", choices=sorted(POLICIES), help="policy for --headless")
+    parser.add_argument("--bench", action="store_true", help="compare policies on random rooms")
+    parser.add_argument("--agents", type=int, default=1, help="agents sharing the room for --headless")
+    parser.add_argument("--workers", type=int, default=None, help="processes for multi-agent planning")
+    parser.add_argument("--episodes", type=int, default=None,
+                        help="run this many random-walk episodes of --size rooms in lock-step")
+    args = parser.parse_args(argv)
+    
+    if args.episodes:
+        sim = BatchSimulation.random(args.episodes, args.size, args.size, seed=args.seed)
+        start = time.perf_counter()
+        moves, cleaned = sim.run(args.steps)
+        elapsed = time.perf_counter() - start
+        print(f"{args.episodes} episodes, {int(sim.steps.sum())} episode-steps in {elapsed:.2f}s")
+        print(f"finished {int(sim.done.sum())}, moves mean {moves.mean():.1f}, "
+              f"cleaned mean {cleaned.mean():.1f}")
+        return 0
+    if args.bench:
+        benchmark_policies()
+        return 0
+    if args.headless and args.agents > 1:
+        sim = random_multi_agent(args.size, args.size, args.agents, seed=args.seed, workers=args.workers)
+        dirt = sim.room.total_dirty
+        start = time.perf_counter()
+        ticks = sim.run(args.steps)
+        elapsed = time.perf_counter() - start
+        print(f"{ticks} ticks in {elapsed:.2f}s, {sim.partitions} partitions, {sim.handoffs} handoffs, "
+              f"{dirt - sim.room.total_dirty}/{dirt} cells cleaned")
+        for row in sim.stats():
+            print(f"agent {row['agent']}: {row['moves']} moves, {row['cleaned']} cleaned, {row['waits']} waits")
+        return 0
+    if args.headless:
+        sim = random_simulation(args.size, args.size, seed=args.seed, policy=POLICIES[args.policy]())
+        dirt = sim.room.total_dirty
+        start = time.perf_counter()
+        steps = sim.run(args.steps)
+        elapsed = time.perf_counter() - start
+        print(f"{steps} steps in {elapsed:.2f}s ({steps / max(elapsed, 1e-9):,.0f} steps/s)")
+        print(f"cleaned {sim.agent.cleaned_count}/{dirt} cells in {sim.agent.moves_count} moves")
+        return 0
+    if tk is None:
+        parser.error("tkinter is not available; use --headless")
     root = tk.Tk()
     app = VacuumGUI(root)
-    root.mainloop()
\ No newline at end of file
+    root.mainloop()
+    return 0
+
+
+# Run the application
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file